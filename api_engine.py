@@ -0,0 +1,123 @@
+import logging
+import itertools
+import importlib.util
+import output_parser
+
+# --- IN-PROCESS ENGINE (yt_dlp Python API) ---
+# Optional: only used when the yt_dlp package is importable. Otherwise the
+# caller falls back to spawning the yt-dlp executable. The package is large, so
+# it is imported on first use rather than at app startup.
+yt_dlp = None
+
+def is_available():
+    return importlib.util.find_spec("yt_dlp") is not None
+
+def _load():
+    global yt_dlp
+    if yt_dlp is None:
+        import yt_dlp as module
+        yt_dlp = module
+    return yt_dlp
+
+def _strip_print_args(argv):
+    # The DATA:: print template is for stdout scraping; hooks replace it here
+    clean = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+            continue
+        if arg == "--print":
+            skip = True
+            continue
+        clean.append(arg)
+    return clean
+
+def build_ydl_opts(argv):
+    # Reuse the exact CLI options built by logic.build_command (minus the executable)
+    parsed = _load().parse_options(_strip_print_args(argv))
+    return parsed.ydl_opts, parsed.urls, parsed.options.load_info_filename
+
+def extract_info(url):
+    with _load().YoutubeDL({"quiet": True, "noplaylist": True}) as ydl:
+        return ydl.sanitize_info(ydl.extract_info(url, download=False))
+
+def iter_playlist(url, start=1):
+    """Yields a playlist's flat entries while the extractor pages through it."""
+    opts = {"quiet": True, "extract_flat": "in_playlist", "lazy_playlist": True}
+    with _load().YoutubeDL(opts) as ydl:
+        # process=False keeps "entries" the extractor's own lazy generator
+        info = ydl.extract_info(url, download=False, process=False)
+        entries = itertools.islice(info.get('entries') or [], start - 1, None)
+        for index, entry in enumerate(entries, start):
+            yield dict(entry, playlist_index=index, playlist_title=info.get('title'))
+
+class _LineLogger(object):
+    # With a logger set, yt-dlp hands it every screen line, quiet or not
+    def __init__(self, on_line):
+        self.on_line = on_line
+
+    def debug(self, msg):
+        self.on_line(msg)
+
+    def warning(self, msg):
+        logging.warning(f"yt-dlp: {msg}")
+        self.on_line(msg)
+
+    def error(self, msg):
+        logging.error(f"yt-dlp: {msg}")
+        self.on_line(msg)
+
+def download(argv, cwd, is_cancelled, on_progress, on_finished, rate_limit=None):
+    """Runs one yt-dlp download in this thread.
+
+    on_progress(event) receives output_parser progress, phase and log events, on_finished(data) one dict
+    per finished file with the same keys the subprocess DATA:: line produces.
+    rate_limit(), if given, returns the current bytes/s allowance for this download.
+    Returns the yt-dlp return code.
+    """
+    ydl_opts, urls, info_file = build_ydl_opts(argv)
+    ydl = None
+
+    def progress_hook(d):
+        if is_cancelled(): raise yt_dlp.utils.DownloadCancelled("Cancelled by user")
+        if d.get('status') != "downloading": return
+        if rate_limit and ydl:
+            # The HTTP downloader shares ydl.params and checks 'ratelimit' per block
+            ydl.params['ratelimit'] = rate_limit()
+        on_progress(output_parser.make_progress_event(d))
+
+    def postprocessor_hook(d):
+        if d.get('status') == "started":
+            on_progress({"type": "phase", "phase": "postprocess"})
+        # MoveFiles is always the last step, so its info_dict holds the final path
+        if d.get('status') == "finished" and d.get('postprocessor') == "MoveFiles":
+            info = d.get('info_dict') or {}
+            on_finished({
+                "path": info.get('filepath') or info.get('_filename') or "",
+                "title": info.get('title') or "",
+                "duration": info.get('duration_string') or "",
+                "size": info.get('filesize') or info.get('filesize_approx') or "NA",
+                "url": info.get('original_url') or "",
+                "video_id": info.get('id') or "",
+                "extractor": info.get('extractor_key') or "",
+            })
+
+    ydl_opts.update({
+        "progress_hooks": [progress_hook],
+        "postprocessor_hooks": [postprocessor_hook],
+        # Retry / skipped fragment lines reach the fragment tuner as log events
+        "logger": _LineLogger(lambda line: on_progress({"type": "log", "line": line})),
+        "paths": {"home": cwd},
+        "quiet": True,
+        "noprogress": True,
+    })
+
+    try:
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            if rate_limit: ydl.params['ratelimit'] = rate_limit()
+            if info_file: return ydl.download_with_info_file(info_file)
+            return ydl.download(urls)
+    except yt_dlp.utils.DownloadCancelled:
+        logging.info("API engine: download cancelled")
+        return 1
@@ -0,0 +1,132 @@
+import time
+import logging
+from urllib.parse import urlsplit, parse_qs, urlunsplit
+import os
+import store
+import format_planner
+import postprocess
+
+# --- DOWNLOAD ARCHIVE ---
+# Remembers every finished video by "<extractor> <id> <variant>", so a URL we
+# already have is skipped before yt-dlp is even started. The variant is the
+# requested output (mode, container / codec, quality): the same video in Sound
+# mode or at another quality is a different download.
+# Rows written before variants existed have the bare "<extractor> <id>" key (yt-dlp's
+# own archive format); they match a variant whose file type equals their file's.
+
+ARCHIVE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS archive (
+    key      TEXT PRIMARY KEY,
+    url      TEXT,
+    path     TEXT,
+    added_at REAL NOT NULL
+);
+"""
+
+_YOUTUBE_HOSTS = ("youtube.com", "www.youtube.com", "m.youtube.com", "music.youtube.com", "youtube-nocookie.com", "www.youtube-nocookie.com")
+
+def output_variant(options):
+    if options['mode'] == "video":
+        return f"video-{format_planner.container_for(options)}-{options['quality'].split()[0].lower()}"
+    tgt, q = format_planner.audio_target(options['audio_fmt'])
+    return f"sound-{tgt}-{q}"
+
+def archive_key(extractor, video_id, variant=None):
+    key = f"{extractor.lower()} {video_id}"
+    return f"{key} {variant}" if variant else key
+
+def _legacy_matches(path, variant):
+    ext = os.path.splitext(path or "")[1].lstrip(".").lower()
+    kind, codec = variant.split("-")[:2]
+    if kind == "video": return ext == codec
+    return ext in (postprocess.AUDIO_EXT.get(codec), postprocess.PASSTHROUGH_EXT.get(codec))
+
+def canonicalize_url(url, playlist=False):
+    """Collapses equivalent spellings of the same video into one URL.
+
+    Returns {"url", "extractor", "video_id"}; extractor/video_id are None when
+    the URL cannot be pinned to a single video (playlists, unknown sites).
+    With playlist=True a "list=" parameter wins over the video id.
+    """
+    url = url.strip()
+    if not (url.startswith("http://") or url.startswith("https://")):
+        url = "https://" + url
+    parts = urlsplit(url)
+    host = parts.netloc.lower()
+    path = parts.path
+    query = parse_qs(parts.query)
+
+    video_id = None
+    if host in ("youtu.be", "www.youtu.be"):
+        video_id = path.strip("/").split("/")[0] or None
+    elif host in _YOUTUBE_HOSTS:
+        if path == "/watch":
+            video_id = (query.get("v") or [None])[0]
+        else:
+            segs = path.strip("/").split("/")
+            if len(segs) >= 2 and segs[0] in ("shorts", "embed", "live", "v"):
+                video_id = segs[1]
+        if query.get("list") and (playlist or not video_id):
+            return {"url": f"https://www.youtube.com/playlist?list={query['list'][0]}", "extractor": None, "video_id": None}
+
+    if video_id:
+        return {"url": f"https://www.youtube.com/watch?v={video_id}", "extractor": "Youtube", "video_id": video_id}
+
+    # Unknown site: normalise only what cannot change the meaning
+    clean = urlunsplit((parts.scheme.lower(), host, path.rstrip("/") or "/", parts.query, ""))
+    return {"url": clean, "extractor": None, "video_id": None}
+
+def _conn():
+    store.ensure_schema("archive", ARCHIVE_SCHEMA)
+    return store.get_connection()
+
+def is_archived(extractor, video_id, variant=None):
+    if not extractor or not video_id: return False
+    try:
+        conn = _conn()
+        if variant and conn.execute("SELECT 1 FROM archive WHERE key = ?", (archive_key(extractor, video_id, variant),)).fetchone():
+            return True
+        row = conn.execute("SELECT path FROM archive WHERE key = ?", (archive_key(extractor, video_id),)).fetchone()
+        return row is not None and (not variant or _legacy_matches(row['path'], variant))
+    except Exception as e:
+        logging.error(f"Archive Load Error: {e}")
+        return False
+
+def add_to_archive(extractor, video_id, url="", path="", variant=None):
+    if not extractor or not video_id: return
+    try:
+        conn = _conn()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO archive (key, url, path, added_at) VALUES (?, ?, ?, ?)",
+                         (archive_key(extractor, video_id, variant), url, path, time.time()))
+    except Exception as e:
+        logging.error(f"Archive Save Error: {e}")
+
+def remove_path(path):
+    # The file was deleted from disk; downloading it again must not be skipped
+    try:
+        conn = _conn()
+        with conn:
+            conn.execute("DELETE FROM archive WHERE path = ?", (path,))
+    except Exception as e:
+        logging.error(f"Archive Save Error: {e}")
+
+def prepare_urls(urls, skip_archived=True, playlist=False, variant=None):
+    """Canonicalizes and de-duplicates URLs, dropping already archived videos.
+
+    Returns (urls_to_download, skipped_urls).
+    """
+    seen = set()
+    result = []
+    skipped = []
+    for raw in urls:
+        if not raw.strip(): continue
+        info = canonicalize_url(raw, playlist)
+        if info['url'] in seen: continue
+        seen.add(info['url'])
+        if skip_archived and is_archived(info['extractor'], info['video_id'], variant):
+            skipped.append(info['url'])
+            logging.info(f"Skipped (already downloaded): {info['url']}")
+            continue
+        result.append(info['url'])
+    return result, skipped
@@ -0,0 +1,151 @@
+import re
+import time
+import logging
+import threading
+
+# --- BANDWIDTH GOVERNOR ---
+# Splits a global budget (bytes/s) across the running jobs without ever handing
+# out more than the budget in total.
+# yt-dlp subprocesses get their share once, as --limit-rate at start, and keep it
+# until they exit: that rate stays committed and is subtracted from the budget.
+# A new subprocess gets the uncommitted rest divided by the slots still to fill.
+# API engine jobs re-read their share on every progress hook; they split what the
+# subprocesses leave, and the ones whose measured throughput stays well below
+# their share (slow server, stalled) are capped near what they actually use.
+# A subprocess cannot be given more later, but one that keeps measuring well below
+# its --limit-rate only holds what it uses (plus headroom); the rest goes to the
+# jobs started after it and to the API engine jobs. Should it speed up again, the
+# total can exceed the budget by at most what was released, until it exits.
+#
+# config.txt:
+#   bandwidth_limit=10M                 (10M, 10 MB/s, 10MiB, 800K ...; empty or 0 = unlimited)
+#   bandwidth_profile=09:00-18:00=20%;18:00-23:00=60%   (outside windows: 100%)
+
+MIN_RATE = 32 * 1024 # never starve a job completely
+STALL_RATIO = 0.8 # using < 80% of its share = limited by something else
+
+MIN_SAMPLES = 10 # progress updates before a subprocess's measured speed counts
+
+_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+_RATE = re.compile(r"^(\d+(?:\.\d*)?|\.\d+)\s*([KMG]?)I?B?(?:/S)?$")
+
+def parse_rate(text):
+    """'10M', '10 MiB/s' -> 10485760 bytes/s; empty or 0 -> None (unlimited).
+
+    Raises ValueError for anything else, so a typo never lifts the cap.
+    """
+    raw = str(text or "").strip()
+    if not raw: return None
+    match = _RATE.match(raw.upper())
+    if not match: raise ValueError(f"Invalid bandwidth limit: {raw!r} (e.g. 10M, 800K, 1.5 MiB/s)")
+    value = float(match.group(1)) * _UNITS[match.group(2)]
+    return int(value) if value > 0 else None
+
+def parse_profile(text):
+    """'09:00-18:00=20%;...' -> [(start_minute, end_minute, fraction), ...]"""
+    windows = []
+    for part in (text or "").split(";"):
+        part = part.strip()
+        if not part: continue
+        try:
+            span, pct = part.split("=")
+            start, end = span.split("-")
+            to_min = lambda hm: int(hm.split(":")[0]) * 60 + int(hm.split(":")[1])
+            windows.append((to_min(start), to_min(end), float(pct.strip().rstrip("%")) / 100.0))
+        except ValueError:
+            logging.error(f"Invalid bandwidth_profile entry: {part}")
+    return windows
+
+def profile_fraction(windows, now=None):
+    t = time.localtime(now)
+    minute = t.tm_hour * 60 + t.tm_min
+    for start, end, fraction in windows:
+        # Windows may wrap past midnight (e.g. 22:00-06:00)
+        inside = start <= minute < end if start <= end else (minute >= start or minute < end)
+        if inside: return fraction
+    return 1.0
+
+class BandwidthGovernor(object):
+    def __init__(self, budget, profile=None, slots=1):
+        self.budget = budget
+        # Worker count: a subprocess's fixed share is sized for the slots that will
+        # run beside it, so the first one does not take the whole budget
+        self.slots = max(1, slots)
+        self.windows = profile or []
+        self.lock = threading.Lock()
+        self.jobs = {} # job_id -> {"speed": measured bytes/s or None, "samples": int, "alloc": bytes/s, "fixed": bool}
+
+    @classmethod
+    def from_options(cls, options, slots=1):
+        budget = parse_rate(options.get('bandwidth_limit'))
+        if not budget: return None
+        return cls(budget, parse_profile(options.get('bandwidth_profile')), slots)
+
+    def current_budget(self):
+        return max(MIN_RATE, int(self.budget * profile_fraction(self.windows)))
+
+    def _reserved(self, j):
+        # What a subprocess holds of the budget: its --limit-rate, or only what it uses
+        # (plus headroom) while it keeps measuring well below that
+        if j["samples"] >= MIN_SAMPLES and j["speed"] < j["alloc"] * STALL_RATIO:
+            return max(MIN_RATE, min(j["alloc"], int(j["speed"] * 1.25)))
+        return j["alloc"]
+
+    def _committed(self, exclude=None):
+        return sum(self._reserved(j) for job_id, j in self.jobs.items() if j["fixed"] and job_id != exclude)
+
+    def _rebalance(self):
+        # Only live (API engine) jobs move; fixed ones keep what they were started with
+        live = {job_id: j for job_id, j in self.jobs.items() if not j["fixed"]}
+        if not live: return
+        budget = max(0, self.current_budget() - self._committed())
+        # Judged against the equal split, not the current allocation, so a capped job stays capped
+        fair = budget / len(live)
+        limited = {}
+        for job_id, j in live.items():
+            if j["speed"] is not None and j["speed"] < fair * STALL_RATIO:
+                # Leave some headroom so a recovering job can ramp back up
+                limited[job_id] = max(MIN_RATE, int(j["speed"] * 1.25))
+        free = len(live) - len(limited)
+        spare = budget - sum(limited.values())
+        share = max(MIN_RATE, int(spare // free)) if free else 0
+        for job_id, j in live.items():
+            j["alloc"] = limited.get(job_id, share)
+
+    def register(self, job_id, fixed=False, outstanding=None):
+        """Adds a job and returns its starting allocation in bytes/s.
+
+        fixed: the job cannot change its rate later (subprocess --limit-rate).
+        outstanding: jobs of the batch not finished yet, this one included; the
+        slots a fixed share is sized for never exceed it.
+        """
+        with self.lock:
+            if fixed:
+                others = sum(1 for other, j in self.jobs.items() if j["fixed"] and other != job_id)
+                slots = min(self.slots, outstanding) if outstanding else self.slots
+                uncommitted = self.current_budget() - self._committed(exclude=job_id)
+                alloc = max(MIN_RATE, int(uncommitted // max(1, slots - others)))
+                self.jobs[job_id] = {"speed": None, "samples": 0, "alloc": alloc, "fixed": True}
+            else:
+                self.jobs[job_id] = {"speed": None, "samples": 0, "alloc": None, "fixed": False}
+            self._rebalance()
+            return self.jobs[job_id]["alloc"]
+
+    def update(self, job_id, speed):
+        with self.lock:
+            if job_id in self.jobs and speed is not None:
+                # Smooth the measurement; yt-dlp's instant speed is noisy
+                j = self.jobs[job_id]
+                j["speed"] = speed if j["speed"] is None else 0.7 * j["speed"] + 0.3 * speed
+                j["samples"] += 1
+                self._rebalance()
+
+    def allocation(self, job_id):
+        with self.lock:
+            j = self.jobs.get(job_id)
+            return j["alloc"] if j else None
+
+    def release(self, job_id):
+        with self.lock:
+            self.jobs.pop(job_id, None)
+            self._rebalance()
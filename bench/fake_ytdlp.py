@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+import os
+import sys
+import json
+import time
+
+# --- STAND-IN YT-DLP ---
+# Replays a recorded yt-dlp stdout for every URL it is given, so the download
+# path can be timed without the network. Understands just enough of the real
+# command line: -J, --load-info-json, --write-info-json, --batch-file, or a trailing URL.
+#   BENCH_RECORDING      file with one output line per line; "{url}" and "{id}"
+#                        are filled in per URL (default: a built-in short replay)
+#   BENCH_LINES_PER_SEC  replay speed, 0 = as fast as the pipe takes it
+
+DEFAULT_RECORDING = ["[youtube] Extracting URL: {url}", "[info] {id}: Downloading 1 format(s): 248+251"] + [
+    "PROG::" + json.dumps({"status": "downloading", "downloaded_bytes": i * 10240, "total_bytes": 1024000,
+                           "speed": 2.5e6, "eta": 100 - i, "fragment_index": i, "fragment_count": 100})
+    for i in range(1, 101)
+] + ["[Merger] Merging formats into \"{id}.webm\"", "DATA::{id}.webm::Title {id}::3:45::1024000::{url}::{id}::Youtube"]
+
+def load_recording():
+    path = os.environ.get("BENCH_RECORDING")
+    if not path: return DEFAULT_RECORDING
+    with open(path, "r", encoding="utf-8") as f:
+        return [l.rstrip("\n") for l in f]
+
+def video_id(url):
+    return url.rsplit("=", 1)[-1].rsplit("/", 1)[-1]
+
+def info_for(url):
+    return {"id": video_id(url), "title": f"Title {video_id(url)}", "original_url": url, "_type": "video",
+            "extractor_key": "Youtube", "formats": []}
+
+def write_info(args, url):
+    # Only the "-o infojson:TEMPLATE" form info_cache.write_args passes
+    for i, arg in enumerate(args[:-1]):
+        if arg == "-o" and args[i + 1].startswith("infojson:"):
+            path = args[i + 1][len("infojson:"):].replace(".%(ext)s", ".info.json").replace("%%", "%")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(info_for(url), f)
+
+def main(args):
+    if "-J" in args:
+        print(json.dumps(info_for(args[-1])))
+        return 0
+    if "--load-info-json" in args:
+        with open(args[args.index("--load-info-json") + 1], "r", encoding="utf-8") as f:
+            urls = [json.load(f)["original_url"]]
+    elif "--batch-file" in args:
+        with open(args[args.index("--batch-file") + 1], "r", encoding="utf-8") as f:
+            urls = [l.strip() for l in f if l.strip()]
+    else:
+        urls = [args[-1]]
+
+    recording = load_recording()
+    rate = float(os.environ.get("BENCH_LINES_PER_SEC") or 0)
+    delay = 1.0 / rate if rate > 0 else 0
+    out = sys.stdout
+    for url in urls:
+        vid = video_id(url)
+        if "--batch-file" in args: out.write(f"START::{url}\n")
+        for line in recording:
+            out.write(line.replace("{url}", url).replace("{id}", vid) + "\n")
+            if delay:
+                out.flush()
+                time.sleep(delay)
+        out.flush()
+        if "--write-info-json" in args: write_info(args, url)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,229 @@
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import platform
+import argparse
+import statistics
+import subprocess
+
+# --- MICRO-BENCHMARKS ---
+# Times the hot paths of the download flow and writes one JSON file per run, so
+# two commits can be compared:
+#   python bench/run_bench.py                    (full run, writes bench/results/<commit>.json)
+#   python bench/run_bench.py --quick            (smaller histories / batches)
+#   python bench/run_bench.py --compare bench/results/OLD.json
+# Everything runs inside a temp directory: history.db, debug.log and the caches
+# of the real app are never touched. UI timings need a display and are skipped without one.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.join(ROOT, "bench")
+sys.path.insert(0, ROOT)
+
+REGRESSION = 1.10 # >10% slower is reported
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda p: samples[min(len(samples) - 1, int(len(samples) * p))]
+    return {"mean_us": statistics.fmean(samples) * 1e6, "p50_us": pick(0.50) * 1e6,
+            "p95_us": pick(0.95) * 1e6, "n": len(samples)}
+
+def _per_call(fn, arg, number):
+    t0 = time.perf_counter()
+    for _ in range(number): fn(arg)
+    return (time.perf_counter() - t0) / number
+
+def synthetic_entry(i):
+    return {"path": f"/media/bench/video_{i:06d}.webm", "video_id": f"vid{i:08d}", "extractor": "Youtube",
+            "title": f"Synthetic video number {i}", "duration": "3:45", "size": "12.3 MB"}
+
+# --- PARSER ---
+def bench_parse(quick):
+    import output_parser
+    lines = {
+        "progress": "PROG::" + json.dumps({"status": "downloading", "downloaded_bytes": 512000, "total_bytes": 1024000,
+                                           "speed": 2.5e6, "eta": 12, "fragment_index": 5, "fragment_count": 100}),
+        "data": "DATA::/media/video.webm::Some title::3:45::1024000::https://www.youtube.com/watch?v=abc::abc::Youtube",
+        "legacy": "[download]  42.0% of 10.00MiB at  1.00MiB/s ETA 00:05",
+        "log": "[youtube] abc: Downloading webpage",
+    }
+    number = 20000 if quick else 100000
+    return {kind: {"ns_per_line": _per_call(output_parser.parse_line, line, number) * 1e9}
+            for kind, line in lines.items()}
+
+def bench_format_size(quick):
+    import logic
+    number = 50000 if quick else 200000
+    return {"ns_per_call": _per_call(logic.format_size, 123456789, number) * 1e9}
+
+# --- HISTORY ---
+def _fill_history(store, size):
+    conn = store._history_conn()
+    with conn:
+        conn.execute("DELETE FROM history")
+        now = time.time()
+        for i in range(size):
+            store._insert_entry(conn, synthetic_entry(i), now - size + i)
+
+def bench_history(quick):
+    import store
+    import ui_helpers
+    results = {}
+    for size in ((50, 1000, 10000) if quick else (50, 1000, 10000, 100000)):
+        _fill_history(store, size)
+        writes = []
+        for i in range(50 if quick else 200):
+            t0 = time.perf_counter()
+            store.add_to_history(synthetic_entry(size + i))
+            writes.append(time.perf_counter() - t0)
+
+        # What one history panel refresh costs without Tk: count + one page + card text
+        refresh = []
+        for _ in range(20):
+            t0 = time.perf_counter()
+            store.count_history()
+            for item in store.load_history(limit=20, offset=0): ui_helpers.history_details(item)
+            refresh.append(time.perf_counter() - t0)
+        results[str(size)] = {"add_to_history": _percentiles(writes), "refresh_data": _percentiles(refresh)}
+    return results
+
+def bench_ui(quick):
+    # Real widget refresh through VirtualHistoryList; needs a display
+    try:
+        import customtkinter as ctk
+        import store
+        import ui_helpers
+        app = ctk.CTk()
+    except Exception as e:
+        return {"skipped": f"no display or customtkinter: {e}"}
+    try:
+        _fill_history(store, 1000 if quick else 10000)
+        panel = ui_helpers.VirtualHistoryList(app, store.load_history, store.count_history, print, print, print)
+        panel.pack(fill="both", expand=True)
+        app.update()
+        samples = []
+        for _ in range(20):
+            t0 = time.perf_counter()
+            panel.reload()
+            app.update_idletasks()
+            samples.append(time.perf_counter() - t0)
+        return {"refresh_history_ui": _percentiles(samples)}
+    finally:
+        app.destroy()
+
+# --- END TO END ---
+def _fake_ytdlp(workdir):
+    # A directly executable stand-in, like the real yt-dlp binary
+    script = os.path.join(BENCH_DIR, "fake_ytdlp.py")
+    if os.name == 'nt':
+        path = os.path.join(workdir, "yt-dlp.cmd")
+        with open(path, "w") as f: f.write(f'@"{sys.executable}" "{script}" %*\n')
+    else:
+        path = os.path.join(workdir, "yt-dlp")
+        with open(path, "w") as f: f.write(f'#!/bin/sh\nexec "{sys.executable}" "{script}" "$@"\n')
+        os.chmod(path, 0o755)
+    return path
+
+def bench_batch(quick, workdir):
+    import logic
+    yt = _fake_ytdlp(workdir)
+    count = 10 if quick else 40
+    base = {'yt_path': yt, 'ff_path': "", 'target_folder': workdir, 'mode': "video", 'debug': False,
+            'is_playlist': False, 'custom_tmpl': "", 'use_subs': False, 'format': "WebM (VP9)",
+            'quality': "720", 'audio_fmt': "", 'meta_artist': "", 'meta_album': "",
+            'skip_archived': False, 'engine': "subprocess", 'info_cache_ttl': 0}
+    callbacks = {'status': lambda m, c: None, 'progress': lambda v: None, 'job_progress': lambda j, e: None,
+                 'refresh_history': lambda e=None: None, 'finish': lambda s, m: None}
+    results = {}
+    for name, extra in (("sequential", {'workers': 1}), ("parallel_3", {'workers': 3}),
+                        ("batch_mode", {'workers': 1, 'batch_mode': True})):
+        urls = [f"https://www.youtube.com/watch?v={name}{i:04d}" for i in range(count)]
+        t0 = time.perf_counter()
+        summary = logic.run_download_logic(urls, dict(base, **extra), callbacks)
+        elapsed = time.perf_counter() - t0
+        results[name] = {"total_s": elapsed, "per_job_ms": elapsed / count * 1000, "succeeded": summary["succeeded"]}
+    return results
+
+# --- RUNNER ---
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True).stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+def flatten(tree, prefix=""):
+    flat = {}
+    for key, value in tree.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict): flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool): flat[name] = value
+    return flat
+
+def compare(old, new):
+    # Lower is better for every timing; counters (".n", ".succeeded") are ignored
+    old_flat, new_flat = flatten(old["results"]), flatten(new["results"])
+    regressions = 0
+    for name in sorted(set(old_flat) & set(new_flat)):
+        if name.endswith((".n", ".succeeded")) or not old_flat[name]: continue
+        ratio = new_flat[name] / old_flat[name]
+        flag = "  REGRESSION" if ratio > REGRESSION else ""
+        regressions += bool(flag)
+        print(f"{name:60s} {old_flat[name]:12.2f} -> {new_flat[name]:12.2f}  x{ratio:.2f}{flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="yt-mini micro-benchmarks")
+    parser.add_argument("--quick", action="store_true", help="Smaller histories and batches")
+    parser.add_argument("--out", help="Result file (default: bench/results/<commit>.json)")
+    parser.add_argument("--compare", help="Earlier result file to compare against")
+    parser.add_argument("--only", nargs="*", help="Run only these groups: parse format_size history ui batch")
+    args = parser.parse_args(argv)
+
+    commit = git_commit()
+    out = os.path.abspath(args.out or os.path.join(BENCH_DIR, "results", f"{commit}.json"))
+    workdir = tempfile.mkdtemp(prefix="ytmini_bench_")
+    cwd = os.getcwd()
+    os.chdir(workdir) # history.db, debug.log and caches are relative to the cwd
+    try:
+        groups = {
+            "parse": lambda: bench_parse(args.quick),
+            "format_size": lambda: bench_format_size(args.quick),
+            "history": lambda: bench_history(args.quick),
+            "ui": lambda: bench_ui(args.quick),
+            "batch": lambda: bench_batch(args.quick, workdir),
+        }
+        results = {}
+        for name, fn in groups.items():
+            if args.only and name not in args.only: continue
+            print(f"running {name}...", file=sys.stderr, flush=True)
+            results[name] = fn()
+    finally:
+        try:
+            import store
+            store.close_connection()
+        except Exception:
+            pass
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {"commit": commit, "timestamp": time.time(), "quick": args.quick,
+                 "python": platform.python_version(), "platform": platform.platform()},
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"results written to {out}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            return 1 if compare(json.load(f), report) else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import threading
+import logging
+import config
+import logic
+import job_queue
+
+# --- HEADLESS ENTRY POINT ---
+# Runs the same download logic as the GUI without importing Tk:
+#   python cli.py download URL [URL ...] [-b batch.txt] [options]
+#   python cli.py enqueue URL [URL ...]      (add to the durable queue only)
+#   python cli.py resume                     (finish the last interrupted batch)
+#   python cli.py daemon [--poll 5]          (keep draining the queue)
+# While downloading, SIGUSR1 pauses and SIGUSR2 resumes (POSIX only).
+# Ctrl+C and SIGTERM stop the downloads but keep them queued for "resume" / the daemon.
+# Exit codes: 0 all ok, 1 some failed, 2 nothing downloaded, 3 setup error, 130 interrupted
+
+EXIT_OK, EXIT_PARTIAL, EXIT_FAILED, EXIT_SETUP, EXIT_INTERRUPTED = 0, 1, 2, 3, 130
+
+def build_options(app_config, args):
+    return {
+        'yt_path': app_config["ytdlp_path"],
+        'ff_path': app_config["ffmpeg_path"],
+        'target_folder': args.out or app_config["download_path"],
+        'mode': args.mode,
+        'debug': args.debug,
+        'is_playlist': args.playlist or args.sync,
+        'custom_tmpl': args.template or "",
+        'use_subs': args.subs,
+        'format': "WebM (VP9)" if args.format == "webm" else "MP4 (H264)",
+        'quality': "Best Possible" if args.quality.lower() == "best" else args.quality,
+        'audio_fmt': args.audio,
+        'meta_artist': args.artist or "",
+        'meta_album': args.album or "",
+        'workers': args.workers or int(app_config.get("max_workers") or 1),
+        'batch_mode': args.single_process,
+        'engine': args.engine or app_config.get("engine", "subprocess"),
+        'skip_archived': not args.no_skip,
+        'info_cache_ttl': int(app_config.get("info_cache_ttl_minutes") or 0),
+        'info_cache_max_mb': int(app_config.get("info_cache_max_mb") or 200),
+        'prefetch': app_config.get("info_prefetch") == "1",
+        'bandwidth_limit': args.limit_rate or app_config.get("bandwidth_limit", ""),
+        'bandwidth_profile': app_config.get("bandwidth_profile", ""),
+        'fragments': args.fragments or app_config.get("concurrent_fragments", "auto"),
+        'pipeline': app_config.get("pipeline_postprocess") == "1",
+        'metrics_format': app_config.get("metrics_format", ""),
+        'partial_max_age_hours': float(app_config.get("partial_max_age_hours") or 0),
+        'sub_langs': args.sub_langs or app_config.get("subtitle_langs", "en,orig"),
+        'embed_subs': args.embed_subs or app_config.get("embed_subs") == "1",
+        'sync': args.sync,
+        'sync_stop_after': int(app_config.get("sync_stop_after") or 10),
+        'dedupe': app_config.get("dedupe", "1") == "1"
+    }
+
+def make_callbacks(json_lines):
+    def emit(event, **fields):
+        fields["event"] = event
+        print(json.dumps(fields), flush=True)
+
+    if json_lines:
+        return {
+            'status': lambda msg, col: emit("status", msg=msg),
+            'progress': lambda val: emit("progress", percent=round(val, 1)),
+            'job_progress': lambda job_id, ev: emit("job_progress", job=job_id, **(ev or {"done": True})),
+            'refresh_history': lambda entry=None: entry and emit("history", **entry),
+            'finish': lambda success, msg: emit("finish", success=success, msg=msg),
+        }
+
+    # Plain terminal output on stderr; overall progress only when the whole percent changes
+    last = {"pct": -1}
+    def progress(val):
+        if int(val) != last["pct"]:
+            last["pct"] = int(val)
+            print(f"\r{int(val):3d}%", end="", file=sys.stderr, flush=True)
+
+    return {
+        'status': lambda msg, col: print(f"\n{msg}", file=sys.stderr, flush=True),
+        'progress': progress,
+        'refresh_history': lambda entry=None: entry and print(f"\n✔ {entry['title']} -> {entry['path']}", file=sys.stderr),
+        'finish': lambda success, msg: print(f"\n{msg}", file=sys.stderr),
+    }
+
+def exit_code(summary):
+    if summary is None: return EXIT_FAILED
+    if summary["cancelled"]: return EXIT_INTERRUPTED
+    if summary["total"] == 0: return EXIT_OK # everything was already archived
+    if summary["succeeded"] == summary["total"]: return EXIT_OK
+    return EXIT_PARTIAL if summary["succeeded"] else EXIT_FAILED
+
+def check_setup(options):
+    try:
+        logic.bandwidth.parse_rate(options.get('bandwidth_limit'))
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return False
+    if options['engine'] == "api" and logic.api_engine.is_available(): return True
+    if not os.path.exists(options['yt_path']):
+        print("yt-dlp path invalid (set ytdlp_path in config.txt)", file=sys.stderr)
+        return False
+    return True
+
+def read_urls(args):
+    urls = list(args.urls)
+    if args.batch:
+        with open(args.batch, "r") as f:
+            urls.extend(l.strip() for l in f if l.strip() and not l.lstrip().startswith("#"))
+    return urls
+
+def run_batch(urls, options, json_lines):
+    # Downloads run in a worker thread so Ctrl+C reaches the main thread and can cancel them
+    result = {}
+    worker = threading.Thread(target=lambda: result.update(summary=logic.run_download_logic(urls, options, make_callbacks(json_lines))))
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: logic.pause_download())
+        signal.signal(signal.SIGUSR2, lambda signum, frame: logic.resume_download())
+    worker.start()
+    try:
+        while worker.is_alive(): worker.join(0.5)
+    except KeyboardInterrupt:
+        logic.interrupt_download()
+        worker.join()
+        return EXIT_INTERRUPTED
+    return exit_code(result.get('summary'))
+
+def cmd_download(args, app_config):
+    options = build_options(app_config, args)
+    if not check_setup(options): return EXIT_SETUP
+    urls = read_urls(args)
+    if not urls:
+        print("No URL provided.", file=sys.stderr)
+        return EXIT_SETUP
+    return run_batch(urls, options, args.json)
+
+def cmd_enqueue(args, app_config):
+    options = build_options(app_config, args)
+    urls, skipped = logic.archive.prepare_urls(read_urls(args), skip_archived=options['skip_archived'], playlist=options['is_playlist'],
+                                               variant=logic.archive.output_variant(options))
+    if not urls:
+        print("Nothing to enqueue.", file=sys.stderr)
+        return EXIT_OK
+    batch_id = job_queue.create_batch(urls, options)
+    print(batch_id)
+    return EXIT_OK
+
+def run_pending(args, pending=None):
+    pending = pending or job_queue.unfinished_batch()
+    if not pending: return None
+    batch_id, urls, options = pending
+    options['queue_batch'] = batch_id
+    if args.out: options['target_folder'] = args.out
+    if not check_setup(options): return EXIT_SETUP
+    logging.info(f"Resuming queue batch {batch_id} ({len(urls)} jobs)")
+    return run_batch(urls, options, args.json)
+
+def cmd_resume(args, app_config):
+    code = run_pending(args)
+    if code is None:
+        print("No unfinished batch.", file=sys.stderr)
+        return EXIT_OK
+    return code
+
+def cmd_daemon(args, app_config):
+    stop = {"flag": False}
+    def on_term(signum, frame):
+        stop["flag"] = True
+        logic.interrupt_download()
+    signal.signal(signal.SIGTERM, on_term)
+
+    worst = EXIT_OK
+    last = None
+    logging.info("Daemon started")
+    while not stop["flag"]:
+        pending = job_queue.unfinished_batch()
+        if not pending or pending[:2] == last:
+            # Idle, or the last pass left the same jobs pending: retry only after the poll interval
+            last = None
+            time.sleep(args.poll)
+            continue
+        last = pending[:2]
+        code = run_pending(args, pending)
+        if code == EXIT_SETUP: return code
+        worst = max(worst, code)
+    return EXIT_INTERRUPTED if stop["flag"] else worst
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--json", action="store_true", help="Report progress as JSON lines on stdout")
+    common.add_argument("--out", help="Download folder (default: download_path from config.txt)")
+
+    parser = argparse.ArgumentParser(prog="yt-mini", description=f"yt-mini v{config.VERSION} (headless)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    for name in ("download", "enqueue"):
+        p = sub.add_parser(name, parents=[common])
+        p.add_argument("urls", nargs="*")
+        p.add_argument("-b", "--batch", help="Text file with one URL per line")
+        p.add_argument("--mode", choices=["video", "sound"], default="video")
+        p.add_argument("--quality", default="720", help="144/240/360/720/1080/1440/2k/4k/best")
+        p.add_argument("--format", choices=["webm", "mp4"], default="webm")
+        p.add_argument("--audio", default="MP3 - High", help='e.g. "Opus - High", "AAC - Medium"')
+        p.add_argument("--artist")
+        p.add_argument("--album")
+        p.add_argument("--playlist", action="store_true")
+        p.add_argument("--sync", action="store_true", help="With --playlist: download only entries added since the last sync")
+        p.add_argument("--subs", action="store_true")
+        p.add_argument("--sub-langs", help='Subtitle preference list, e.g. "en,orig,de" (orig = original language)')
+        p.add_argument("--embed-subs", action="store_true", help="Embed the subtitles into the video file")
+        p.add_argument("--template", help="Custom filename template")
+        p.add_argument("--workers", type=int)
+        p.add_argument("--single-process", action="store_true", help="Run the batch through one yt-dlp process")
+        p.add_argument("--engine", choices=["subprocess", "api"])
+        p.add_argument("--limit-rate", help="Total bandwidth for the batch, e.g. 5M (split across jobs)")
+        p.add_argument("--fragments", help='Concurrent DASH/HLS fragments per job: "auto" or a number')
+        p.add_argument("--no-skip", action="store_true", help="Download even if already in the archive")
+        p.add_argument("--debug", action="store_true")
+
+    sub.add_parser("resume", parents=[common])
+    p = sub.add_parser("daemon", parents=[common])
+    p.add_argument("--poll", type=float, default=5.0, help="Seconds between queue checks when idle")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    app_config = config.load_config()
+    commands = {"download": cmd_download, "enqueue": cmd_enqueue, "resume": cmd_resume, "daemon": cmd_daemon}
+    try:
+        return commands[args.command](args, app_config)
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+
+if __name__ == "__main__":
+    sys.exit(main())
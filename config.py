@@ -1,11 +1,17 @@
 import os
-import json
+import shutil
 import logging
+import log_setup
 
 VERSION = "3.1"
 CONFIG_FILE = "config.txt"
-HISTORY_FILE = "history.json"
+HISTORY_FILE = "history.json" # legacy, migrated into HISTORY_DB on first start
+HISTORY_DB = "history.db"
 LOG_FILE = "debug.log"
+INFO_CACHE_DIR = "info_cache"
+TOOLS_CACHE_FILE = "tools_cache.json"
+METRICS_PROM_FILE = "metrics.prom"
+METRICS_JSONL_FILE = "metrics.jsonl"
 
 CREATE_NO_WINDOW = 0x08000000 if os.name == 'nt' else 0
 
@@ -14,27 +20,47 @@ TOOLTIPS = {
     "paste": "Paste URL from clipboard",
     "browse": "Select download folder",
     "playlist": "If checked, creates a subfolder named after the playlist.\nFiles will be numbered (01 - Title).",
-    "subs": "Downloads English and Original language subtitles (.vtt)",
+    "subs": "Downloads only the subtitle languages listed in subtitle_langs (config.txt),\ndefault English and the video's original language (.vtt)",
+    "sync": "With Playlist checked: downloads only the entries added since the last sync.\nThe listing stops once it reaches videos the last sync already had.",
+    "embed_subs": "Puts the downloaded subtitles into the video file instead of separate files.",
     "advanced": "Reveal Batch Mode and custom filename templates",
     "format": "WebM (VP9): Better compression (smaller files).\nMP4 (H264): Better compatibility (plays everywhere).",
     "quality": "Downloads the best available quality up to this limit.",
     "audio_fmt": "Select the codec and bitrate.\nOpus is most efficient, MP3 is most compatible.",
-    "meta": "Embed Artist/Album tags directly into the music file."
+    "meta": "Embed Artist/Album tags directly into the music file.",
+    "batch_mode": "Runs the whole batch through one yt-dlp process.\nSaves startup time per video, but jobs can only be cancelled together.",
+    "engine": "Python API runs yt-dlp inside the app (needs the yt_dlp package).\nFalls back to the yt-dlp executable when it is not installed.",
+    "skip_archived": "Skips videos already downloaded in the same mode, format and quality (any link spelling).\nUncheck to download them again anyway."
 }
 
-# Logging
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
+# Logging (queued, rotated; see log_setup.py). load_config re-applies config.txt's log_* keys
+log_setup.setup(LOG_FILE)
 
 DEFAULT_CONFIG = {
     "ytdlp_path": "",
     "ffmpeg_path": "",
     "download_path": os.path.join(os.path.expanduser("~"), "Desktop"),
-    "theme": "dark"
+    "theme": "dark",
+    "max_workers": "3",
+    "batch_mode": "0",
+    "engine": "subprocess",
+    "skip_archived": "1",
+    "info_cache_ttl_minutes": "180",
+    "info_cache_max_mb": "200",
+    "info_prefetch": "1",
+    "bandwidth_limit": "",
+    "bandwidth_profile": "",
+    "concurrent_fragments": "auto",
+    "pipeline_postprocess": "1",
+    "metrics_format": "",
+    "log_max_mb": "5",
+    "log_backups": "3",
+    "log_format": "text",
+    "partial_max_age_hours": "72",
+    "subtitle_langs": "en,orig",
+    "embed_subs": "0",
+    "sync_stop_after": "10",
+    "dedupe": "1"
 }
 
 THEMES = {
@@ -66,8 +92,16 @@ def load_config():
                             config[key] = value
         except Exception as e:
             logging.error(f"Config Load Error: {e}")
+    apply_logging(config)
     return config
 
+def apply_logging(config):
+    try:
+        log_setup.setup(LOG_FILE, float(config["log_max_mb"] or 5), int(config["log_backups"] or 3),
+                        "json" if config["log_format"] == "json" else "text")
+    except ValueError as e:
+        logging.error(f"Config Load Error: {e}")
+
 def save_config(config_data):
     try:
         with open(CONFIG_FILE, "w") as f:
@@ -76,40 +110,21 @@ def save_config(config_data):
     except Exception as e:
         logging.error(f"Config Save Error: {e}")
 
-def load_history():
-    if os.path.exists(HISTORY_FILE):
-        try:
-            with open(HISTORY_FILE, "r") as f:
-                return json.load(f)
-        except Exception as e:
-            logging.error(f"History Load Error: {e}")
-            return []
-    return []
-
-# --- THIS WAS THE MISSING FUNCTION ---
-def save_history_list(history_list):
-    try:
-        temp_file = HISTORY_FILE + ".tmp"
-        with open(temp_file, "w") as f:
-            json.dump(history_list, f, indent=4)
-        if os.path.exists(HISTORY_FILE):
-            os.remove(HISTORY_FILE)
-        os.rename(temp_file, HISTORY_FILE)
-    except Exception as e:
-        logging.error(f"History Save Error: {e}")
-# -------------------------------------
-
-def add_to_history(entry):
-    history = load_history()
-    history = [x for x in history if x['path'] != entry['path']]
-    history.insert(0, entry)
-    history = history[:50]
-    save_history_list(history) # Now reuses the safe save function
-
 def factory_reset():
+    log_setup.shutdown() # releases debug.log so it can be deleted
     try:
         if os.path.exists(CONFIG_FILE): os.remove(CONFIG_FILE)
         if os.path.exists(HISTORY_FILE): os.remove(HISTORY_FILE)
-        if os.path.exists(LOG_FILE): os.remove(LOG_FILE)
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(HISTORY_DB + suffix): os.remove(HISTORY_DB + suffix)
+        for name in os.listdir("."):
+            # debug.log plus its rotated debug.log.N.gz files
+            if name == LOG_FILE or (name.startswith(LOG_FILE + ".") and name.endswith(".gz")): os.remove(name)
+        if os.path.isdir(INFO_CACHE_DIR): shutil.rmtree(INFO_CACHE_DIR)
+        if os.path.exists(TOOLS_CACHE_FILE): os.remove(TOOLS_CACHE_FILE)
+        for path in (METRICS_PROM_FILE, METRICS_JSONL_FILE):
+            if os.path.exists(path): os.remove(path)
     except Exception as e:
-        logging.error(f"Reset Error: {e}")
\ No newline at end of file
+        logging.error(f"Reset Error: {e}")
+    finally:
+        log_setup.setup(LOG_FILE)
\ No newline at end of file
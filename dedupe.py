@@ -0,0 +1,159 @@
+import os
+import mmap
+import time
+import hashlib
+import logging
+import threading
+import store
+try:
+    import fcntl
+except ImportError: # Windows: hardlinks only
+    fcntl = None
+
+# --- CONTENT DEDUPE ---
+# The same media often lands on disk more than once (playlist folder, custom
+# template, plain title). Every finished file is indexed by size and a partial
+# hash (first and last 64 KiB). Only when both match an indexed file are the two
+# hashed in full, memory-mapped a window at a time. A confirmed duplicate is
+# replaced by a reflink (copy-on-write clone, btrfs/XFS) or else a hardlink to the
+# indexed copy, and the bytes saved are stored with the history entry.
+# Index rows of files deleted or changed since are dropped when next compared;
+# files deleted from the history drop theirs right away.
+
+CONTENT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS content_index (
+    path      TEXT PRIMARY KEY,
+    size      INTEGER NOT NULL,
+    partial   TEXT NOT NULL,
+    hash      TEXT,
+    reclaimed INTEGER NOT NULL DEFAULT 0,
+    added_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_content_prefilter ON content_index(size, partial);
+"""
+
+PARTIAL_BYTES = 64 * 1024
+WINDOW_BYTES = 16 * 1024 * 1024 # a multiple of mmap.ALLOCATIONGRANULARITY everywhere (mmap offsets must be)
+FICLONE = 0x40049409 # Linux ioctl: the new file shares the source's extents
+
+_lock = threading.Lock() # one lookup + insert at a time, so two identical files finishing together still pair up
+
+def _conn():
+    store.ensure_schema("content_index", CONTENT_SCHEMA)
+    return store.get_connection()
+
+def partial_hash(path, size):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        h.update(f.read(PARTIAL_BYTES))
+        if size > 2 * PARTIAL_BYTES:
+            f.seek(-PARTIAL_BYTES, os.SEEK_END)
+            h.update(f.read(PARTIAL_BYTES))
+    return h.hexdigest()
+
+def full_hash(path):
+    h = hashlib.blake2b()
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        for offset in range(0, size, WINDOW_BYTES):
+            # One window mapped at a time keeps the address space use flat for multi-GB files
+            with mmap.mmap(f.fileno(), min(WINDOW_BYTES, size - offset), access=mmap.ACCESS_READ, offset=offset) as window:
+                h.update(window)
+    return h.hexdigest()
+
+def _reflink(original, target):
+    if fcntl is None: return False
+    try:
+        with open(original, "rb") as src, open(target, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        return True
+    except OSError:
+        # Not a CoW filesystem (or across devices)
+        if os.path.exists(target): os.remove(target)
+        return False
+
+def _link(original, duplicate):
+    # Built next to the duplicate, then swapped in, so the path is never missing
+    tmp = duplicate + ".dedupe"
+    try:
+        if _reflink(original, tmp):
+            method = "reflink"
+        else:
+            os.link(original, tmp)
+            method = "hardlink"
+        os.replace(tmp, duplicate)
+        return method
+    except OSError as e:
+        logging.warning(f"Dedupe could not link {duplicate} to {original}: {e}")
+        if os.path.exists(tmp): os.remove(tmp)
+        return None
+
+def process(path):
+    """Indexes a finished file and links it to an identical indexed one.
+
+    Returns {"original", "method", "reclaimed"} when the file was replaced by a
+    link, otherwise None.
+    """
+    try:
+        size = os.path.getsize(path)
+        if size == 0: return None
+        partial = partial_hash(path, size)
+        with _lock:
+            conn = _conn()
+            rows = conn.execute("SELECT path, hash FROM content_index WHERE size = ? AND partial = ? AND path != ?",
+                                (size, partial, path)).fetchall()
+            previous = conn.execute("SELECT reclaimed FROM content_index WHERE path = ?", (path,)).fetchone()
+            digest = None
+            result = None
+            still_linked = False
+            for row in rows:
+                other = row['path']
+                if not os.path.exists(other) or os.path.getsize(other) != size:
+                    with conn: conn.execute("DELETE FROM content_index WHERE path = ?", (other,))
+                    continue
+                if os.path.samefile(other, path):
+                    still_linked = True # indexed again (re-download skipped); keep its saving
+                    continue
+                digest = digest or full_hash(path)
+                other_hash = row['hash']
+                if not other_hash:
+                    other_hash = full_hash(other)
+                    with conn: conn.execute("UPDATE content_index SET hash = ? WHERE path = ?", (other_hash, other))
+                if other_hash != digest: continue
+                method = _link(other, path)
+                if method:
+                    result = {"original": other, "method": method, "reclaimed": size}
+                    logging.info(f"Dedupe: {path} is a {method} to {other} ({size} bytes reclaimed)")
+                    break
+            if result: reclaimed = result['reclaimed']
+            else: reclaimed = previous['reclaimed'] if previous and still_linked else 0
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO content_index (path, size, partial, hash, reclaimed, added_at) VALUES (?, ?, ?, ?, ?, ?)",
+                             (path, size, partial, digest, reclaimed, time.time()))
+        return result
+    except Exception as e:
+        logging.error(f"Dedupe Error: {e}")
+        return None
+
+def remove_path(path):
+    # The file was deleted; it neither saves space nor can be linked to any more
+    try:
+        conn = _conn()
+        with conn:
+            conn.execute("DELETE FROM content_index WHERE path = ?", (path,))
+    except Exception as e:
+        logging.error(f"Dedupe Save Error: {e}")
+
+def total_reclaimed():
+    try:
+        conn = _conn()
+        # Linked files deleted outside the app no longer save anything
+        gone = [(r['path'],) for r in conn.execute("SELECT path FROM content_index WHERE reclaimed > 0")
+                if not os.path.exists(r['path'])]
+        if gone:
+            with conn: conn.executemany("DELETE FROM content_index WHERE path = ?", gone)
+        row = conn.execute("SELECT COALESCE(SUM(reclaimed), 0) AS n FROM content_index").fetchone()
+        return row['n']
+    except Exception as e:
+        logging.error(f"Dedupe Load Error: {e}")
+        return 0
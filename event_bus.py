@@ -0,0 +1,70 @@
+import threading
+
+# --- UI EVENT BUS ---
+# Download threads push updates here instead of scheduling Tk callbacks
+# themselves. The UI drains the bus at a fixed frame rate, so a fast download
+# costs one widget update per tick no matter how many lines yt-dlp prints.
+# Only the latest value of each kind (and per job) is kept.
+
+class UIEventBus(object):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._status = None
+        self._progress = None
+        self._jobs = {}
+        self._refresh_history = False
+        self._new_history = []
+        self._finish = None
+
+    # --- Producer side (any thread) ---
+    def status(self, msg, color):
+        with self._lock: self._status = (msg, color)
+
+    def progress(self, val):
+        with self._lock: self._progress = val
+
+    def job_progress(self, job_id, event):
+        # event=None: the job is no longer downloading (finished or paused)
+        with self._lock:
+            if event is None: self._jobs.pop(job_id, None)
+            else: self._jobs[job_id] = event
+
+    def refresh_history(self, entry=None):
+        # entry = the one new history row (incremental); None = full reload
+        with self._lock:
+            if entry is None: self._refresh_history = True
+            else: self._new_history.append(entry)
+
+    def finish(self, success, msg):
+        with self._lock: self._finish = (success, msg)
+
+    def callbacks(self):
+        # Same shape logic.run_download_logic expects
+        return {
+            'status': self.status,
+            'progress': self.progress,
+            'job_progress': self.job_progress,
+            'refresh_history': self.refresh_history,
+            'finish': self.finish,
+        }
+
+    # --- Consumer side (Tk main loop) ---
+    def drain(self):
+        """Returns everything queued since the last call as one merged update."""
+        with self._lock:
+            update = {
+                "status": self._status,
+                "progress": self._progress,
+                "jobs": dict(self._jobs),
+                "refresh_history": self._refresh_history,
+                "new_history": self._new_history,
+                "finish": self._finish,
+            }
+            jobs = self._jobs
+            self._reset()
+            # Running jobs stay visible until they report completion
+            self._jobs = jobs
+        return update
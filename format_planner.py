@@ -0,0 +1,150 @@
+import logging
+
+# --- FORMAT PLANNER ---
+# Picks the exact video + audio format ids from the (cached) info dict, so the
+# merge into the target container is a pure remux (ffmpeg -c copy). The old
+# "-S vcodec:... --merge-output-format ..." selectors could pair e.g. a VP9 video
+# with an AAC track and leave ffmpeg to transcode. Only when no compatible audio
+# exists is the audio re-encoded (video never is); the plan says so up front.
+# Without info (playlists, cache off, extraction failed) the generic selectors apply.
+# Audio comes from the original language track, never a dub or a DRC variant.
+
+# container -> (video codec families, audio codec families) it can hold by remux
+CONTAINERS = {
+    "webm": ({"vp9", "vp8", "av1"}, {"opus", "vorbis"}),
+    "mp4": ({"h264", "h265", "av1"}, {"aac", "mp3"}),
+}
+PREFERRED = {"webm": ("vp9", "opus"), "mp4": ("h264", "aac")}
+AUDIO_ENCODER = {"webm": "libopus", "mp4": "aac"}
+
+QUALITY_HEIGHTS = {"144": 144, "240": 240, "360": 360, "720": 720, "1080": 1080, "1440": 1440, "2k": 1440, "4k": 2160}
+
+def video_family(codec):
+    c = (codec or "").lower()
+    if c.startswith(("avc", "h264")): return "h264"
+    if c.startswith(("hev", "hvc", "h265")): return "h265"
+    if c.startswith(("vp09", "vp9")): return "vp9"
+    if c.startswith(("vp08", "vp8")): return "vp8"
+    if c.startswith(("av01", "av1")): return "av1"
+    return c
+
+def audio_family(codec):
+    c = (codec or "").lower()
+    if c.startswith(("mp4a", "aac")): return "aac"
+    if c.startswith("opus"): return "opus"
+    if c.startswith("vorbis"): return "vorbis"
+    if c.startswith("mp3"): return "mp3"
+    return c
+
+def container_for(options):
+    return "webm" if "WebM" in options['format'] else "mp4"
+
+def height_cap(options):
+    if options['quality'] == "Best Possible": return None
+    return QUALITY_HEIGHTS.get(options['quality'], 720)
+
+def _has(codec):
+    return codec not in (None, "none")
+
+def _is_drc(f):
+    # YouTube's dynamic range compressed variants ("251-drc"), which "ba" never picks
+    return "-drc" in str(f.get('format_id') or "") or "DRC" in (f.get('format_note') or "")
+
+def _language_preference(f):
+    pref = f.get('language_preference')
+    return -1 if pref is None else pref
+
+def audio_tracks(formats):
+    """Audio-only formats of the original track: highest language_preference, no DRC variants."""
+    audios = [f for f in formats if _has(f.get('acodec')) and not _has(f.get('vcodec'))]
+    audios = [f for f in audios if not _is_drc(f)] or audios
+    if not audios: return []
+    # Dubbed tracks rank below the original audio
+    top = max(_language_preference(f) for f in audios)
+    return [f for f in audios if _language_preference(f) == top]
+
+def plan(info, options):
+    """Returns {"video", "audio", "format", "container", "reencode", "audio_encoder"} or None.
+
+    None means no remux-compatible video was found; the caller should fall back
+    to the generic selectors.
+    """
+    formats = info.get('formats') or []
+    container = container_for(options)
+    v_ok, a_ok = CONTAINERS[container]
+    pref_v, pref_a = PREFERRED[container]
+    cap = height_cap(options)
+
+    videos = [f for f in formats if _has(f.get('vcodec')) and not _has(f.get('acodec'))
+              and video_family(f.get('vcodec')) in v_ok
+              and (cap is None or (f.get('height') or 0) <= cap)]
+    audios = audio_tracks(formats)
+    if not videos or not audios: return None
+
+    # Preferred codec first (what the Format menu promises), then resolution, fps, bitrate
+    video = max(videos, key=lambda f: (video_family(f.get('vcodec')) == pref_v, f.get('height') or 0,
+                                       f.get('fps') or 0, f.get('tbr') or 0))
+    compatible = [f for f in audios if audio_family(f.get('acodec')) in a_ok]
+    audio_key = lambda f: (audio_family(f.get('acodec')) == pref_a, f.get('abr') or f.get('tbr') or 0)
+    audio = max(compatible or audios, key=audio_key)
+
+    result = {
+        "video": video['format_id'],
+        "audio": audio['format_id'],
+        "format": f"{video['format_id']}+{audio['format_id']}",
+        "container": container,
+        "reencode": not compatible,
+        "audio_encoder": None if compatible else AUDIO_ENCODER[container],
+    }
+    logging.info(f"Format plan {info.get('id')}: {result['format']} -> {container}"
+                 f" ({video_family(video.get('vcodec'))}/{audio_family(audio.get('acodec'))}, "
+                 f"{'audio re-encode' if result['reencode'] else 'remux only'})")
+    return result
+
+# --- SOUND MODE ---
+# "-x --audio-format X" decodes and re-encodes even when the best track already
+# is X. If the chosen track matches the requested codec and its bitrate meets the
+# quality tier, it is extracted with "--audio-format best", which copies the
+# stream (Opus -> .opus, AAC -> .m4a). Otherwise the usual transcode runs.
+
+# --audio-quality value -> minimum source bitrate (kbps) that satisfies the tier
+TIER_MIN_KBPS = {"0": 128, "5": 96, "10": 0}
+
+def audio_target(audio_fmt):
+    """Menu label (e.g. "Opus - High") -> (codec for --audio-format, --audio-quality)."""
+    raw_fmt = audio_fmt.lower()
+    # Fuzzy match the format name
+    if "opus" in raw_fmt: tgt = "opus"
+    elif "aac" in raw_fmt: tgt = "aac"
+    elif "m4a" in raw_fmt: tgt = "m4a"
+    elif "vorbis" in raw_fmt: tgt = "vorbis"
+    elif "wav" in raw_fmt: tgt = "wav"
+    else: tgt = "mp3" # Default if nothing else matches
+
+    # Map Quality
+    if "high" in raw_fmt: q = "0"
+    elif "medium" in raw_fmt: q = "5"
+    else: q = "10"
+    return tgt, q
+
+def plan_audio(info, options):
+    """Returns {"format", "passthrough", "reencode", "codec", "kbps"} or None without audio formats."""
+    audios = audio_tracks(info.get('formats') or [])
+    if not audios: return None
+    tgt, q = audio_target(options['audio_fmt'])
+    wanted = "aac" if tgt == "m4a" else tgt
+    kbps = lambda f: f.get('abr') or f.get('tbr') or 0
+
+    matching = [f for f in audios if audio_family(f.get('acodec')) == wanted and kbps(f) >= TIER_MIN_KBPS[q]]
+    passthrough = bool(matching)
+    audio = max(matching or audios, key=kbps)
+    result = {
+        "format": audio['format_id'],
+        "passthrough": passthrough,
+        "reencode": not passthrough,
+        "codec": audio_family(audio.get('acodec')),
+        "kbps": kbps(audio),
+    }
+    logging.info(f"Audio plan {info.get('id')}: {audio['format_id']} ({result['codec']} {result['kbps']:.0f}k) -> "
+                 f"{'passthrough' if passthrough else 'transcode to ' + tgt}")
+    return result
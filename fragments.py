@@ -0,0 +1,80 @@
+import logging
+import threading
+from urllib.parse import urlparse
+
+# --- CONCURRENT FRAGMENT TUNER ---
+# DASH/HLS formats are downloaded fragment by fragment; yt-dlp's -N fetches several
+# at once. The best N depends on the site and the connection, so with
+# concurrent_fragments=auto it is hill-climbed per site: every finished fragmented
+# job reports its average throughput for the N it ran with. N doubles while
+# throughput keeps rising, falls back to the best N seen once it stops helping,
+# and is halved (and capped there) when the site throttles or fragments error out.
+# Throttling shows as yt-dlp retry warnings (HTTP 429/403), as a gap of more than
+# STALL_SECONDS between progress updates (no data while fragments are retried or
+# backed off), or as a speed that stays below SLOWDOWN of the job's peak for
+# SLOW_SAMPLES progress updates in a row.
+# A fixed number in config.txt disables tuning; 1 disables -N entirely.
+
+MIN_N, START_N, MAX_N = 1, 4, 16
+GAIN = 1.10 # >10% faster counts as an improvement
+THROTTLE_MARKERS = ("HTTP Error 429", "HTTP Error 403", "Too Many Requests", "Retrying fragment", "fragment not found")
+STALL_SECONDS = 10
+SLOWDOWN = 0.25
+SLOW_SAMPLES = 20
+
+_sites = {}
+_lock = threading.Lock()
+
+def site_of(url):
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+def is_throttle_line(line):
+    return any(m in line for m in THROTTLE_MARKERS)
+
+def watch(state, event, now, check_speed=True):
+    """Feeds one progress event of a fragmented job; True when it looks throttled.
+
+    state is a dict the caller keeps per job. check_speed=False when the speed is
+    being limited on purpose (the API engine follows the bandwidth governor live).
+    """
+    last = state.get('last')
+    state['last'] = now
+    if last is not None and now - last > STALL_SECONDS: return True
+    speed = event.get('speed')
+    if speed and check_speed:
+        state['peak'] = max(state.get('peak', 0.0), speed)
+        state['slow'] = state.get('slow', 0) + 1 if speed < state['peak'] * SLOWDOWN else 0
+        if state['slow'] >= SLOW_SAMPLES: return True
+    return False
+
+def _fixed(options):
+    setting = str(options.get('fragments', "auto")).strip().lower()
+    if setting == "auto": return None
+    try: return max(MIN_N, min(MAX_N, int(setting)))
+    except ValueError: return None
+
+def choose(url, options):
+    """Returns the -N value for a job on url (1 = do not pass -N)."""
+    fixed = _fixed(options)
+    if fixed is not None: return fixed
+    with _lock:
+        return _sites.setdefault(site_of(url), {"n": START_N, "best_n": None, "best_speed": 0.0, "ceiling": MAX_N})["n"]
+
+def report(url, n, speed, throttled):
+    # Called once per finished fragmented job; speed is its average bytes/s
+    with _lock:
+        state = _sites.get(site_of(url))
+        if state is None or n != state["n"]: return # tuned since this job started
+        if throttled:
+            state["ceiling"] = max(MIN_N, n // 2)
+            state["n"] = state["ceiling"]
+            if state["best_n"] and state["best_n"] > state["ceiling"]:
+                state["best_n"], state["best_speed"] = None, 0.0
+        elif speed:
+            if speed > state["best_speed"] * GAIN:
+                state["best_n"], state["best_speed"] = n, speed
+                state["n"] = min(state["ceiling"], n * 2)
+            elif state["best_n"] and n != state["best_n"]:
+                state["n"] = state["best_n"] # more parallelism did not pay off
+        logging.info(f"Fragment tuner {site_of(url)}: N={n} speed={speed or 0:.0f} B/s throttled={throttled} -> next N={state['n']}")
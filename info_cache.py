@@ -0,0 +1,163 @@
+import os
+import gzip
+import json
+import time
+import logging
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from config import INFO_CACHE_DIR, CREATE_NO_WINDOW
+import archive
+import api_engine
+
+# --- METADATA CACHE ---
+# Extraction results ("yt-dlp -J") are kept as gzip'd info-JSON files named after
+# the canonical video id. Within the TTL a re-run (another quality, Video vs Sound)
+# feeds yt-dlp the cached info with --load-info-json instead of extracting again.
+# A job never extracts just to fill the cache: on a miss the download itself
+# writes the info (--write-info-json), which is then moved into the cache. Only
+# prefetch extracts ahead, in the background while earlier jobs download.
+# Stream URLs inside the info expire after a few hours, so keep the TTL short.
+
+_key_locks = {}
+_key_locks_guard = threading.Lock()
+
+def _key_lock(key):
+    with _key_locks_guard:
+        return _key_locks.setdefault(key, threading.Lock())
+
+def cache_key(url):
+    info = archive.canonicalize_url(url)
+    if not info['video_id']: return None # playlists / unknown sites are not cached
+    return f"{info['extractor'].lower()}_{info['video_id']}"
+
+def _cache_path(key):
+    return os.path.join(INFO_CACHE_DIR, key + ".info.json.gz")
+
+def _read(key, ttl):
+    path = _cache_path(key)
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            record = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.warning(f"Info cache read failed ({key}): {e}")
+        return None
+    if time.time() - record.get('fetched_at', 0) > ttl:
+        return None
+    os.utime(path) # mtime = last use, for LRU eviction
+    return record['info']
+
+def _write(key, info):
+    os.makedirs(INFO_CACHE_DIR, exist_ok=True)
+    path = _cache_path(key)
+    tmp = path + ".tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=6) as f:
+        json.dump({"fetched_at": time.time(), "info": info}, f)
+    os.replace(tmp, path)
+
+def _extract(url, options):
+    if api_engine.is_available() and options.get('engine') == "api":
+        return api_engine.extract_info(url)
+    result = subprocess.run(
+        [options['yt_path'], "-J", "--no-playlist", url],
+        capture_output=True, text=True, encoding='utf-8', errors='ignore', creationflags=CREATE_NO_WINDOW)
+    if result.returncode != 0:
+        logging.warning(f"Info extraction failed for {url}: {result.stderr.strip()[-300:]}")
+        return None
+    return json.loads(result.stdout)
+
+def get_info(url, options, extract=True):
+    """Returns the info dict for a single-video URL, from cache when fresh.
+
+    None when the URL is not cacheable, caching is off, or extraction failed.
+    extract=False only looks in the cache (waiting for a prefetch of the same video).
+    """
+    ttl = options.get('info_cache_ttl', 0) * 60
+    key = cache_key(url)
+    if not key or ttl <= 0: return None
+    with _key_lock(key): # prefetch and the job never extract the same video twice
+        info = _read(key, ttl)
+        if info is not None:
+            logging.info(f"Info cache hit: {key}")
+            return info
+        if not extract: return None
+        try:
+            info = _extract(url, options)
+        except Exception as e:
+            logging.warning(f"Info extraction failed for {url}: {e}")
+            info = None
+        if info is not None and info.get('_type', "video") == "video":
+            try:
+                _write(key, info)
+                evict(options.get('info_cache_max_mb', 200))
+            except Exception as e:
+                logging.error(f"Info cache write failed ({key}): {e}")
+            return info
+    return None
+
+def _written_path(key):
+    # yt-dlp swaps the template's extension for .info.json
+    return os.path.abspath(os.path.join(INFO_CACHE_DIR, key + ".info.json"))
+
+def write_args(url, options):
+    """yt-dlp args that make a download write its info where store_written() picks it up."""
+    key = cache_key(url)
+    if not key or options.get('info_cache_ttl', 0) <= 0: return []
+    template = os.path.abspath(os.path.join(INFO_CACHE_DIR, key)).replace("%", "%%") + ".%(ext)s"
+    return ["--write-info-json", "-o", f"infojson:{template}"]
+
+def store_written(url, options):
+    """Moves the info a download wrote (see write_args) into the cache."""
+    key = cache_key(url)
+    if not key: return
+    path = _written_path(key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            info = json.load(f)
+        with _key_lock(key):
+            _write(key, info)
+        evict(options.get('info_cache_max_mb', 200))
+    except FileNotFoundError:
+        return
+    except Exception as e:
+        logging.error(f"Info cache write failed ({key}): {e}")
+    try: os.remove(path)
+    except OSError: pass
+
+def materialize(info):
+    """Writes info to a temp .info.json for --load-info-json; caller removes it."""
+    fd, path = tempfile.mkstemp(prefix="ytmini_", suffix=".info.json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(info, f)
+    return path
+
+def evict(max_mb):
+    # Size-bounded LRU: drop least recently used files until under the limit
+    try:
+        files = []
+        for name in os.listdir(INFO_CACHE_DIR):
+            if not name.endswith(".info.json.gz"): continue
+            st = os.stat(os.path.join(INFO_CACHE_DIR, name))
+            files.append((st.st_mtime, st.st_size, name))
+    except FileNotFoundError:
+        return
+    total = sum(f[1] for f in files)
+    limit = max_mb * 1024 * 1024
+    for mtime, size, name in sorted(files):
+        if total <= limit: break
+        try:
+            os.remove(os.path.join(INFO_CACHE_DIR, name))
+            total -= size
+        except OSError:
+            pass
+
+def start_prefetch(urls, options, workers=2):
+    """Warms the cache for queued URLs in the background; returns the executor."""
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="info-prefetch")
+    for url in urls:
+        pool.submit(get_info, url, options)
+    pool.shutdown(wait=False)
+    return pool
@@ -0,0 +1,134 @@
+import json
+import time
+import uuid
+import logging
+import store
+
+# --- DURABLE JOB QUEUE ---
+# Every batch is written to the database before the first download starts and
+# each job's state is updated as it changes. After a crash or reboot the app
+# resumes from the first unfinished job; finished jobs are never fetched again.
+# States: pending, running, paused, done, failed, skipped, cancelled
+
+QUEUE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    batch_id   TEXT NOT NULL,
+    position   INTEGER NOT NULL,
+    url        TEXT NOT NULL,
+    state      TEXT NOT NULL DEFAULT 'pending',
+    attempts   INTEGER NOT NULL DEFAULT 0,
+    options    TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (batch_id, url)
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs(state);
+CREATE TABLE IF NOT EXISTS partials (
+    path        TEXT PRIMARY KEY,
+    recorded_at REAL NOT NULL
+);
+"""
+
+UNFINISHED_STATES = ("pending", "running", "paused")
+MAX_ATTEMPTS = 3 # a job that keeps crashing the app is given up on
+
+def _conn():
+    store.ensure_schema("jobs", QUEUE_SCHEMA)
+    return store.get_connection()
+
+def create_batch(urls, options):
+    batch_id = uuid.uuid4().hex
+    snapshot = json.dumps(options)
+    now = time.time()
+    try:
+        conn = _conn()
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO jobs (batch_id, position, url, options, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(batch_id, i, url, snapshot, now) for i, url in enumerate(urls)])
+    except Exception as e:
+        logging.error(f"Queue Save Error: {e}")
+    return batch_id
+
+def set_state(batch_id, url, state, new_attempt=True):
+    # new_attempt=False: "running" again after a pause, which is not another start
+    try:
+        conn = _conn()
+        with conn:
+            if state == "running" and new_attempt:
+                conn.execute("UPDATE jobs SET state = ?, attempts = attempts + 1, updated_at = ? WHERE batch_id = ? AND url = ?",
+                             (state, time.time(), batch_id, url))
+            else:
+                conn.execute("UPDATE jobs SET state = ?, updated_at = ? WHERE batch_id = ? AND url = ?",
+                             (state, time.time(), batch_id, url))
+    except Exception as e:
+        logging.error(f"Queue Save Error: {e}")
+
+def unfinished_batch():
+    """Returns (batch_id, urls, options) of the oldest batch with work left, or None."""
+    try:
+        conn = _conn()
+        row = conn.execute(
+            "SELECT batch_id FROM jobs WHERE state IN ('pending', 'running', 'paused') ORDER BY updated_at LIMIT 1").fetchone()
+        if not row: return None
+        batch_id = row['batch_id']
+        with conn:
+            # "running" at startup means the app died mid-download
+            conn.execute("UPDATE jobs SET state = 'failed' WHERE batch_id = ? AND state = 'running' AND attempts >= ?",
+                         (batch_id, MAX_ATTEMPTS))
+            conn.execute("UPDATE jobs SET state = 'pending' WHERE batch_id = ? AND state IN ('running', 'paused')", (batch_id,))
+        rows = conn.execute(
+            "SELECT url, options FROM jobs WHERE batch_id = ? AND state = 'pending' ORDER BY position", (batch_id,)).fetchall()
+        if not rows: return None
+        return batch_id, [r['url'] for r in rows], json.loads(rows[0]['options'])
+    except Exception as e:
+        logging.error(f"Queue Load Error: {e}")
+        return None
+
+def batch_summary(batch_id):
+    rows = _conn().execute("SELECT state, COUNT(*) AS n FROM jobs WHERE batch_id = ? GROUP BY state", (batch_id,)).fetchall()
+    return {r['state']: r['n'] for r in rows}
+
+def discard_batch(batch_id):
+    try:
+        conn = _conn()
+        with conn:
+            conn.execute("DELETE FROM jobs WHERE batch_id = ?", (batch_id,))
+    except Exception as e:
+        logging.error(f"Queue Save Error: {e}")
+
+def close_batch(batch_id):
+    # Nothing left to resume: drop the rows so the table does not grow forever
+    try:
+        summary = batch_summary(batch_id)
+        if not any(summary.get(s) for s in UNFINISHED_STATES):
+            discard_batch(batch_id)
+            logging.info(f"Queue batch {batch_id} closed: {summary}")
+    except Exception as e:
+        logging.error(f"Queue Save Error: {e}")
+
+# --- PARTIAL FILES ---
+# Leftovers of paused, failed and cancelled downloads. Only these paths are ever
+# removed by the partial sweep (logic.sweep_partials).
+def record_partials(paths):
+    try:
+        conn = _conn()
+        with conn:
+            conn.executemany("INSERT OR IGNORE INTO partials (path, recorded_at) VALUES (?, ?)",
+                             [(path, time.time()) for path in paths])
+    except Exception as e:
+        logging.error(f"Queue Save Error: {e}")
+
+def tracked_partials():
+    try:
+        return [r['path'] for r in _conn().execute("SELECT path FROM partials")]
+    except Exception as e:
+        logging.error(f"Queue Load Error: {e}")
+        return []
+
+def forget_partials(paths):
+    try:
+        conn = _conn()
+        with conn:
+            conn.executemany("DELETE FROM partials WHERE path = ?", [(path,) for path in paths])
+    except Exception as e:
+        logging.error(f"Queue Save Error: {e}")
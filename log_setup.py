@@ -0,0 +1,111 @@
+import os
+import gzip
+import json
+import queue
+import atexit
+import shutil
+import logging
+import threading
+import logging.handlers
+
+# --- LOGGING ---
+# Every logging call only puts the record on an in-memory queue (QueueHandler);
+# one listener thread formats it and writes debug.log. Download workers never wait
+# on the disk. debug.log is rotated by size and the rotated files are gzip'd
+# (debug.log.1.gz, ...). With log_format=json each line is a JSON object that
+# carries the batch and job id of the thread that logged it.
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_context = threading.local()
+_listener = None
+_console = None
+_settings = None
+
+def set_job(job_id, batch_id=None):
+    """Tags every record logged from this thread with the job (None clears it)."""
+    _context.job_id = job_id
+    _context.batch_id = batch_id
+
+class JobContextFilter(logging.Filter):
+    # Runs in the logging thread, before the record is queued
+    def filter(self, record):
+        record.job_id = getattr(_context, "job_id", None)
+        record.batch_id = getattr(_context, "batch_id", None)
+        return True
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        line = {
+            "ts": self.formatTime(record, DATE_FORMAT),
+            "level": record.levelname,
+            "thread": record.threadName,
+            "job": getattr(record, "job_id", None),
+            "batch": getattr(record, "batch_id", None),
+            "msg": record.getMessage(),
+        }
+        if record.exc_info: line["exc"] = self.formatException(record.exc_info)
+        return json.dumps(line, ensure_ascii=False)
+
+class CompressingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler that gzips each rotated file."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.namer = lambda name: name + ".gz"
+        self.rotator = self._gzip_rotate
+
+    @staticmethod
+    def _gzip_rotate(source, dest):
+        with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(source)
+
+def setup(log_file, max_mb=5, backups=3, fmt="text"):
+    """(Re)builds the logging pipeline; a no-op when the settings did not change."""
+    global _listener, _console, _settings
+    settings = (os.path.abspath(log_file), max_mb, backups, fmt)
+    if settings == _settings: return
+    old_listener = _listener
+
+    file_handler = CompressingRotatingFileHandler(log_file, maxBytes=int(max_mb * 1024 * 1024),
+                                                  backupCount=backups, encoding="utf-8", delay=True)
+    file_handler.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT, DATE_FORMAT))
+    # Debug mode echo (set_console); off by default
+    _console = logging.StreamHandler()
+    _console.setFormatter(logging.Formatter(TEXT_FORMAT, DATE_FORMAT))
+    _console.setLevel(logging.CRITICAL + 1)
+
+    records = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(records)
+    queue_handler.addFilter(JobContextFilter())
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(logging.INFO)
+
+    _listener = logging.handlers.QueueListener(records, file_handler, _console, respect_handler_level=True)
+    _listener.start()
+    _settings = settings
+    # The old listener drains its queue before it stops, so nothing logged before the swap is lost
+    if old_listener: _stop(old_listener)
+
+def set_console(enabled):
+    # Mirrors the log to stderr (the old debug-mode print) without a second code path
+    if _console: _console.setLevel(logging.INFO if enabled else logging.CRITICAL + 1)
+
+def _stop(listener):
+    listener.stop()
+    for handler in listener.handlers: handler.close()
+
+def shutdown():
+    # Flushes whatever is still queued; registered with atexit
+    global _listener, _settings
+    if _listener:
+        _stop(_listener)
+        _listener = None
+        _settings = None
+
+atexit.register(shutdown)
@@ -1,13 +1,29 @@
 import subprocess
 import os
-import shutil
-import logging
 import re
-import tkinter as tk
-from tkinter import messagebox
-from config import add_to_history, CREATE_NO_WINDOW
-
-current_process = None
+import logging
+import time
+import threading
+import glob
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from store import add_to_history
+import api_engine
+import archive
+import bandwidth
+import fragments
+import dedupe
+import format_planner
+import info_cache
+import job_queue
+import notify
+import output_parser
+import postprocess
+import metrics
+import log_setup
+import playlist_sync
+import process_tree
+import subtitles
 
 def format_size(size_bytes):
     try:
@@ -24,7 +40,7 @@ def install_via_winget(package_id):
         subprocess.run(["start", "cmd", "/k", f"winget install {package_id} && exit"], shell=True)
     except Exception as e:
         logging.error(f"Winget Error: {e}")
-        messagebox.showerror("Error", f"Could not launch installer: {e}")
+        notify.error("Error", f"Could not launch installer: {e}")
 
 def update_tools(yt_path):
     msg = "Update process started...\n\n"
@@ -41,27 +57,7 @@ def update_tools(yt_path):
     
     subprocess.run(["start", "cmd", "/k", "winget upgrade Gyan.FFmpeg && exit"], shell=True)
     msg += "✅ FFmpeg update launched in new window."
-    messagebox.showinfo("Updater", msg)
-
-def auto_detect_ytdlp():
-    path = shutil.which("yt-dlp")
-    if not path:
-        winget_path = os.path.expanduser(r"~\AppData\Local\Microsoft\WinGet\Packages")
-        for root, dirs, files in os.walk(winget_path):
-            if "yt-dlp.exe" in files: return os.path.join(root, "yt-dlp.exe")
-    return path or ""
-
-def get_all_ffmpeg_paths():
-    found_paths = []
-    try:
-        result = subprocess.run(["where", "ffmpeg"], capture_output=True, text=True)
-        if result.returncode == 0:
-            found_paths.extend(result.stdout.strip().splitlines())
-    except: pass
-    common_locs = [r"C:\ffmpeg\bin\ffmpeg.exe", r"C:\Program Files\ffmpeg\bin\ffmpeg.exe"]
-    for p in common_locs:
-        if os.path.exists(p) and p not in found_paths: found_paths.append(p)
-    return list(dict.fromkeys(found_paths))
+    notify.info("Updater", msg)
 
 # --- OPEN FUNCTIONS ---
 def open_folder_safe(file_path):
@@ -75,7 +71,7 @@ def open_folder_safe(file_path):
             os.startfile(folder)
         else:
             logging.warning(f"Failed to open path: {file_path}")
-            messagebox.showerror("Error", f"Folder not found:\n{folder}")
+            notify.error("Error", f"Folder not found:\n{folder}")
 
 def open_file_safe(file_path):
     file_path = os.path.normpath(file_path.strip())
@@ -83,170 +79,873 @@ def open_file_safe(file_path):
         try:
             os.startfile(file_path)
         except Exception as e:
-            messagebox.showerror("Error", f"Could not open file: {e}")
+            notify.error("Error", f"Could not open file: {e}")
     else:
-        messagebox.showerror("Error", f"File not found at:\n{file_path}\n\nIt may have been moved or deleted.")
+        notify.error("Error", f"File not found at:\n{file_path}\n\nIt may have been moved or deleted.")
         
-def cancel_download():
-    global current_process
-    if current_process:
+# --- JOB SCHEDULER ---
+# Every URL is a job dict: {"id", "url", "state", "process", "percent"}
+# States: pending -> running (<-> paused) -> done / failed / cancelled
+active_jobs = {}
+jobs_lock = threading.Lock()
+jobs_changed = threading.Condition(jobs_lock) # wakes workers waiting on a paused job
+batch_cancelled = threading.Event()
+batch_paused = threading.Event() # pending jobs do not start while set
+governor = None # bandwidth.BandwidthGovernor of the running batch, None = unlimited
+pipeline = None # postprocess.Pipeline of the running batch, None = yt-dlp post-processes inline
+last_command_written = threading.Event() # last_command.txt is written once per batch
+batch_interrupted = threading.Event() # set on shutdown: cancelled jobs stay resumable in the queue
+
+def cancel_download(job_id=None):
+    # No job_id = cancel the whole batch (running + not yet started)
+    cancelled = False
+    with jobs_lock:
+        if job_id is None:
+            batch_cancelled.set()
+            targets = list(active_jobs.values())
+        else:
+            targets = [active_jobs[job_id]] if job_id in active_jobs else []
+            # Batch mode jobs share one yt-dlp process; only the whole batch can be stopped
+            if targets and targets[0].get('shared') and targets[0]['state'] == "running":
+                logging.warning(f"Job {job_id} shares the batch process; cancel the whole batch instead.")
+                return False
+
+        for job in targets:
+            if job['state'] in ("pending", "paused"):
+                job['state'] = "cancelled"
+                cancelled = True
+            elif job['state'] == "running":
+                # API engine jobs have no process; their progress hook sees the state and aborts
+                try:
+                    process_tree.terminate_tree(job['process'])
+                    job['state'] = "cancelled"
+                    cancelled = True
+                    logging.info(f"User cancelled job {job['id']}: {job['url']}")
+                except Exception as e:
+                    logging.error(f"Failed to kill process: {e}")
+        jobs_changed.notify_all()
+    return cancelled
+
+def interrupt_download():
+    """Stops the batch like cancel_download, but the queue keeps its jobs for the next start."""
+    batch_interrupted.set()
+    return cancel_download()
+
+# --- PAUSE / RESUME ---
+# Pausing stops the job's whole process tree (yt-dlp and its ffmpeg) and keeps the
+# worker thread waiting. The .part / .ytdl / fragment files stay on disk, and the
+# resumed run passes --continue so yt-dlp picks up where it stopped. Jobs already
+# in the post-processing stage finish; batch mode (one shared process) cannot pause.
+def pause_download(job_id=None):
+    paused = False
+    with jobs_lock:
+        if any(j.get('shared') for j in active_jobs.values()):
+            logging.warning("Batch mode jobs share one yt-dlp process; pause is not available.")
+            return False
+        if job_id is None:
+            batch_paused.set()
+            targets = list(active_jobs.values())
+        else:
+            targets = [active_jobs[job_id]] if job_id in active_jobs else []
+
+        for job in targets:
+            if job['state'] == "running" and job.get('stage') != "post":
+                job['state'] = "paused"
+                process_tree.terminate_tree(job['process']) # API engine: the progress hook aborts
+                paused = True
+                logging.info(f"User paused job {job['id']}: {job['url']}")
+            elif job['state'] == "pending":
+                if job_id is not None: job['state'] = "paused"
+                paused = True
+    return paused
+
+def resume_download(job_id=None):
+    resumed = False
+    with jobs_lock:
+        if job_id is None:
+            batch_paused.clear()
+            targets = list(active_jobs.values())
+            resumed = True
+        else:
+            targets = [active_jobs[job_id]] if job_id in active_jobs else []
+        for job in targets:
+            if job['state'] == "paused":
+                job['state'] = "pending"
+                resumed = True
+        jobs_changed.notify_all()
+    return resumed
+
+def _wait_until_runnable(job):
+    # Blocks while the job or the batch is paused; False if it was cancelled meanwhile
+    with jobs_lock:
+        while (job['state'] == "paused" or batch_paused.is_set()) and \
+                job['state'] != "cancelled" and not batch_cancelled.is_set():
+            jobs_changed.wait()
+        if job['state'] == "cancelled" or batch_cancelled.is_set():
+            job['state'] = "cancelled"
+            return False
+        job['state'] = "running"
+    return True
+
+# yt-dlp's own leftovers of media downloads: .part / .part-FragN / .ytdl resume files,
+# merger .temp files and unmerged "-f a,b" parts (Title.f137.mp4)
+MEDIA_EXT = r"(mp4|m4a|webm|mkv|mov|flv|3gp|ts|mp3|opus|ogg|oga|aac|flac|wav|vtt|srt|ass)"
+PARTIAL_FILE = re.compile(rf"(\.f\d+(-\w+)?)?\.{MEDIA_EXT}(\.part(-Frag\d+)?|\.ytdl)$"
+                          rf"|\.f\d+(-\w+)?\.{MEDIA_EXT}$|\.temp\.{MEDIA_EXT}$")
+
+def _track_partials(job, options):
+    # Records what a paused, failed or cancelled job may have left behind: yt-dlp named
+    # files in the output folder (and playlist subfolders) written since the job started
+    since = job.get('started_at')
+    folder = os.path.abspath(options['target_folder'])
+    if not since or not os.path.isdir(folder): return
+    found = []
+    base_depth = folder.rstrip(os.sep).count(os.sep)
+    for dirpath, dirs, files in os.walk(folder):
+        if dirpath.count(os.sep) - base_depth >= 1: dirs[:] = []
+        for name in files:
+            if not PARTIAL_FILE.search(name): continue
+            path = os.path.join(dirpath, name)
+            try:
+                if os.path.getmtime(path) >= since: found.append(path)
+            except OSError: pass
+    if found: job_queue.record_partials(found)
+
+def sweep_partials(max_age_hours):
+    """Deletes tracked partial downloads (see _track_partials) untouched for max_age_hours."""
+    if not max_age_hours: return 0
+    cutoff = time.time() - max_age_hours * 3600
+    removed = 0
+    gone = []
+    for path in job_queue.tracked_partials():
         try:
-            current_process.terminate()
-            logging.info("User cancelled the download process.")
-            current_process = None
-            return True
-        except Exception as e:
-            logging.error(f"Failed to kill process: {e}")
-    return False
+            if not os.path.exists(path):
+                gone.append(path) # resumed and finished, or deleted by the user
+            elif os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                gone.append(path)
+                removed += 1
+        except OSError as e:
+            logging.warning(f"Partial sweep could not remove {path}: {e}")
+    if gone: job_queue.forget_partials(gone)
+    if removed: logging.info(f"Partial sweep removed {removed} abandoned file(s)")
+    return removed
 
-def run_download_logic(urls, options, callbacks):
-    global current_process
-    
-    yt_path = options['yt_path']
+def use_api_engine(options):
+    # The subprocess engine stays the fallback when the yt_dlp package is missing
+    if options.get('engine') != "api": return False
+    if not api_engine.is_available():
+        logging.warning("yt_dlp package not installed; falling back to the yt-dlp executable.")
+        return False
+    return True
+
+def build_command(video_url, options, info_json=None, limit_rate=None, concurrent_fragments=None, plan=None, subtitle_langs=None):
+    command = [options['yt_path']]
+
+    if options['is_playlist']:
+        template = f"%(playlist_title)s/%(playlist_index)s - %(title)s.%(ext)s"
+        command.extend(["-o", template, "--yes-playlist"])
+    elif options['custom_tmpl']:
+         tmpl = options['custom_tmpl']
+         if not tmpl.endswith(".%(ext)s"): tmpl += ".%(ext)s"
+         command.extend(["-o", tmpl, "--no-playlist"])
+    else:
+        command.extend(["-o", "%(title)s.%(ext)s", "--no-playlist"])
+
+    print_template = "after_move:DATA::%(filepath)s::%(title)s::%(duration_string)s::%(filesize,filesize_approx)s::%(original_url)s::%(id)s::%(extractor_key)s"
+    command.extend(["--print", print_template])
+    command.extend(output_parser.PHASE_PRINTS)
+    command.extend(output_parser.progress_args())
+
+    split = bool(plan and plan.get('split'))
+    if options['use_subs']:
+        # Only the tracks subtitles.select() found in the info (None: preference list as is)
+        command.extend(subtitles.command_args(subtitle_langs, options, embed_inline=not split))
+
+    if os.path.exists(options['ff_path']): 
+        command.extend(["--ffmpeg-location", options['ff_path']])
+
+    if split:
+        # Pipelined: download the parts only; postprocess.py merges / extracts them
+        i = command.index("-o")
+        # One subtitle file per language, named after the final file rather than each part
+        if options['use_subs']: command.extend(["-o", f"subtitle:{command[i + 1]}"])
+        command[i + 1] = postprocess.part_template(command[i + 1])
+
+    if options['mode'] == "video" and split:
+        command.extend(["-f", f"{plan['video']},{plan['audio']}"])
+    elif options['mode'] == "video" and plan:
+        # Exact format ids from format_planner: the merge is a remux
+        command.extend(["-f", plan['format'], "--merge-output-format", plan['container']])
+        if plan['reencode']:
+            # No audio track fits the container; transcode audio only, keep copying video
+            command.extend(["--postprocessor-args", f"Merger+ffmpeg_o:-c:a {plan['audio_encoder']}"])
+    elif options['mode'] == "video":
+        if options['quality'] == "Best Possible": 
+            # Use bv* to include all protocols (DASH/HLS) and prioritize merge
+            fmt = "bv*+ba/b"
+        else:
+            # Added 1080 mapping
+            h = {"144": "144", "240": "240", "360": "360", "720": "720", "1080": "1080", "1440": "1440", "2k": "1440", "4k": "2160"}.get(options['quality'], "720")
+            fmt = f"bv*[height<={h}]+ba/b[height<={h}]"
+        command.extend(["-f", fmt])
+        
+        if "WebM" in options['format']: command.extend(["-S", "vcodec:vp9", "--merge-output-format", "webm"])
+        else: command.extend(["-S", "vcodec:h264", "--merge-output-format", "mp4"])
+    elif split:
+        command.extend(["-f", plan['format']])
+    else:
+        # --- ROBUST AUDIO FORMAT LOGIC ---
+        tgt, q = format_planner.audio_target(options['audio_fmt'])
+
+        if plan: command.extend(["-f", plan['format']])
+        if plan and plan['passthrough']:
+            # Source already is the requested codec at the requested tier: copy, don't transcode
+            command.extend(["-x", "--audio-format", "best"])
+        else:
+            command.extend(["-x", "--audio-format", tgt, "--audio-quality", q])
+        
+        # Metadata args...
+        if options['meta_artist'] or options['meta_album']:
+            meta = ""
+            if options['meta_artist']: meta += f"-metadata artist=\"{options['meta_artist']}\" "
+            if options['meta_album']: meta += f"-metadata album=\"{options['meta_album']}\" "
+            command.extend(["--postprocessor-args", f"ffmpeg:{meta}"])
+
+    # Per-job share of the global bandwidth budget (bytes/s)
+    if limit_rate: command.extend(["--limit-rate", str(limit_rate)])
+    # Parallel fragment downloads for DASH/HLS formats (no effect on single-file formats)
+    if concurrent_fragments and concurrent_fragments > 1: command.extend(["-N", str(concurrent_fragments)])
+
+    # Cached metadata replaces the URL, so yt-dlp skips extraction entirely
+    if info_json: command.extend(["--load-info-json", info_json])
+    # video_url is None in batch mode, where the caller adds --batch-file instead
+    elif video_url: command.append(video_url)
+    return command
+
+def _report_progress(jobs, callbacks):
+    # Whole-batch progress: finished jobs count as 100%, running ones by their own percent
+    total = sum(100.0 if j['state'] in ("done", "failed", "cancelled") else j['percent'] for j in jobs)
+    callbacks['progress'](total / len(jobs))
+
+def _persist_state(job, options, new_attempt=True):
+    # Sync entries have no queue row; their playlist's row is resumed instead
+    if options.get('queue_batch') and not job.get('playlist'):
+        state = job['state']
+        # Stopped by SIGTERM / Ctrl+C rather than the user: resume it after the restart
+        if state == "cancelled" and batch_interrupted.is_set(): state = "pending"
+        job_queue.set_state(options['queue_batch'], job['url'], state, new_attempt)
+
+def _report_fragments(job):
+    # Only fragmented (DASH/HLS) downloads tell the tuner anything about -N
+    if not job.get('fragmented') or not job.get('speed_samples'): return
+    speed = job['speed_total'] / job['speed_samples']
+    # A fragmented download that failed counts as a back-off, like a throttled one
+    throttled = job.get('throttled', False) or job['state'] == "failed"
+    logging.info(f"Job {job['id']} finished with -N {job['fragments']}: avg {format_size(speed)}/s{' (throttled)' if throttled else ''}")
+    if job['state'] == "done" or throttled:
+        fragments.report(job['url'], job['fragments'], speed, throttled)
+
+def _report_job_finished(job, jobs, options, callbacks):
+    if job['state'] in ("failed", "cancelled"): _track_partials(job, options)
+    _report_fragments(job)
+    metrics.record_job(job, options)
+    logging.info(f"Job {job['id']} phases: {metrics.snapshot(job)}")
+    metrics.close(job)
+    _persist_state(job, options)
+    if 'job_progress' in callbacks: callbacks['job_progress'](job['id'], None)
+    _report_progress(jobs, callbacks)
+
+def _apply_event(event, job):
+    # Events that only move the job's phase clock
+    if event['type'] == "phase":
+        metrics.mark(job, event['phase'])
+    elif event['type'] == "log":
+        phase = metrics.phase_for_line(event['line'])
+        if phase: metrics.mark(job, phase)
+        if fragments.is_throttle_line(event['line']): job['throttled'] = True
+
+def _apply_progress(event, job, jobs, callbacks):
+    metrics.mark(job, "download")
+    job['progress'] = event
+    if event.get('speed') is not None:
+        if governor: governor.update(job['id'], event['speed'])
+        job['speed_total'] = job.get('speed_total', 0.0) + event['speed']
+        job['speed_samples'] = job.get('speed_samples', 0) + 1
+    if event.get('fragment_count'):
+        job['fragmented'] = True
+        # The API engine applies the governor's allocation live; a drop there is not the site
+        watch = job.setdefault('fragment_watch', {})
+        if fragments.watch(watch, event, time.monotonic(), check_speed=not job.get('live_rate')):
+            job['throttled'] = True
+    if 'job_progress' in callbacks: callbacks['job_progress'](job['id'], event)
+    if event['percent'] is not None:
+        job['percent'] = event['percent']
+        _report_progress(jobs, callbacks)
+
+def _log_debug_command(command):
+    # --- DEBUGGER MODE ---  #hata belki
+    cmd_str = " ".join(command)
+    # 1. Log to debug.log (also echoed to the terminal: log_setup.set_console in debug mode)
+    logging.info(f"DEBUG COMMAND: {cmd_str}")
+    # 2. Save the batch's first command to a file for easy reading
+    if not last_command_written.is_set():
+        last_command_written.set()
+        with open("last_command.txt", "w", encoding="utf-8") as f:
+            f.write(cmd_str)
+
+def _record_download(data, job, options, callbacks):
     target_folder = options['target_folder']
+    raw_path = data['path']
     
+    # --- CRITICAL PATH FIX: FORCE ABSOLUTE PATH ---
+    if not os.path.isabs(raw_path):
+        full_path = os.path.join(target_folder, raw_path)
+        # This converts "video.mp4" into "C:\Users\Desktop\video.mp4"
+        full_path = os.path.abspath(full_path)
+    else:
+        full_path = raw_path
+    # ----------------------------------------------
+
+    metrics.mark(job, "history")
+    try:
+        size_bytes = int(data['size'])
+    except (TypeError, ValueError):
+        size_bytes = 0
+    job['bytes'] = job.get('bytes', 0) + size_bytes
+    # Identical media already on disk (other folder / template): keep one copy, link the other
+    duplicate = dedupe.process(full_path) if options.get('dedupe', True) and os.path.isfile(full_path) else None
+
+    entry = {
+        "path": full_path,
+        "video_id": data['video_id'] or None,
+        "extractor": data['extractor'],
+        "title": data['title'],
+        "duration": data['duration'],
+        "size": format_size(data['size'])
+    }
+    if job.get('plan'):
+        entry["format_id"] = job['plan']['format']
+        entry["reencode"] = job['plan']['reencode']
+        if 'passthrough' in job['plan']:
+            entry["audio_path"] = "passthrough" if job['plan']['passthrough'] else "transcode"
+    if duplicate:
+        entry["reclaimed"] = format_size(duplicate['reclaimed'])
+        entry["dedupe"] = duplicate['method']
+    entry["phases"] = metrics.snapshot(job)
+    add_to_history(entry)
+    archive.add_to_archive(data['extractor'], data['video_id'], job['url'], full_path, archive.output_variant(options))
+    metrics.mark(job, "postprocess") # a playlist's next item switches back to download
+    callbacks['refresh_history'](entry)
+    logging.info(f"Download Success: {job['url']}")
+
+def _run_job_api(job, jobs, options, callbacks, info_json=None):
+    # Same job contract as _run_job, but yt-dlp runs inside this thread
+    command = build_command(job['url'], options, info_json, concurrent_fragments=job['fragments'], plan=job.get('plan'),
+                            subtitle_langs=job.get('subs'))
+    if job.get('fill_cache'): command[1:1] = info_cache.write_args(job['url'], options)
+    if job.get('resumes'): command.insert(1, "--continue")
+    if options.get('debug', False): _log_debug_command(command)
+
+    # The API engine re-reads its allocation on every progress hook
+    rate_limit = (lambda: governor.allocation(job['id'])) if governor else None
+    job['live_rate'] = bool(rate_limit)
+
     success_count = 0
-    total_count = len(urls)
+    def on_progress(event):
+        if event['type'] in ("phase", "log"): _apply_event(event, job)
+        else: _apply_progress(event, job, jobs, callbacks)
 
-    logging.info(f"Starting batch of {total_count} downloads. Mode: {options['mode']}")
+    def on_finished(data):
+        nonlocal success_count
+        _record_download(data, job, options, callbacks)
+        success_count += 1
 
-    for index, video_url in enumerate(urls):
-        callbacks['status'](f"Processing {index+1}/{total_count}...", "blue")
-        callbacks['progress'](0)
-        
-        command = [yt_path]
-        
-        if options['is_playlist']:
-            template = f"%(playlist_title)s/%(playlist_index)s - %(title)s.%(ext)s"
-            command.extend(["-o", template, "--yes-playlist"])
-        elif options['custom_tmpl']:
-             tmpl = options['custom_tmpl']
-             if not tmpl.endswith(".%(ext)s"): tmpl += ".%(ext)s"
-             command.extend(["-o", tmpl, "--no-playlist"])
-        else:
-            command.extend(["-o", "%(title)s.%(ext)s", "--no-playlist"])
+    try:
+        ret = api_engine.download(command[1:], options['target_folder'],
+                                  lambda: job['state'] in ("cancelled", "paused") or batch_cancelled.is_set(),
+                                  on_progress, on_finished, rate_limit)
+        if ret != 0 and job['state'] != "paused":
+             logging.error(f"Return Code {ret} (job {job['id']}, API engine)")
+    except Exception as e:
+        logging.critical(f"Critical System Error: {e}")
+    finally:
+        with jobs_lock:
+            if job['state'] == "running":
+                job['state'] = "done" if success_count else "failed"
+        if job['state'] != "paused": _report_job_finished(job, jobs, options, callbacks)
+    return success_count
+
+def _run_job(job, jobs, options, callbacks):
+    log_setup.set_job(job['id'], options.get('queue_batch'))
+    try:
+        return _run_job_stages(job, jobs, options, callbacks)
+    finally:
+        log_setup.set_job(None)
+
+def _register_bandwidth(job, options):
+    if not governor: return None
+    # A subprocess keeps its --limit-rate until it exits; the governor reserves it for that long
+    with jobs_lock:
+        outstanding = sum(1 for j in active_jobs.values() if j['state'] in ("pending", "running", "paused"))
+    return governor.register(job['id'], fixed=not use_api_engine(options), outstanding=outstanding)
+
+def _run_job_stages(job, jobs, options, callbacks):
+    if not _wait_until_runnable(job): return 0
+    job.setdefault('started_at', time.time())
+    metrics.mark(job, "extract")
+    _persist_state(job, options)
+
+    limit_rate = _register_bandwidth(job, options)
+    if limit_rate: logging.info(f"Job {job['id']} bandwidth share: {format_size(limit_rate)}/s")
+    job['fragments'] = fragments.choose(job['url'], options)
+    logging.info(f"Job {job['id']} concurrent fragments: {job['fragments']} ({fragments.site_of(job['url'])})")
+
+    info = _cached_info(job, options)
+    if info and options['mode'] == "video":
+        job['plan'] = format_planner.plan(info, options)
+    elif info:
+        job['plan'] = format_planner.plan_audio(info, options)
+    if info and options['use_subs']:
+        job['subs'] = subtitles.select(info, options)
+    if pipeline and job.get('plan') and not use_api_engine(options):
+        job['plan']['split'] = True
+    info_json = _materialize_info(info)
+    success_count = 0
+    try:
+        while True:
+            if use_api_engine(options):
+                success_count += _run_job_api(job, jobs, options, callbacks, info_json)
+            else:
+                success_count += _run_job_subprocess(job, jobs, options, callbacks, info_json, limit_rate)
+            if job['state'] != "paused": return success_count
+
+            # Paused mid-download: give up the bandwidth share and wait for resume or cancel
+            _persist_state(job, options)
+            _track_partials(job, options)
+            job.pop('fragment_watch', None) # the pause is not a stall
+            if governor: governor.release(job['id'])
+            # Nothing is downloading; drop the job's last speed from the UI
+            if 'job_progress' in callbacks: callbacks['job_progress'](job['id'], None)
+            if not _wait_until_runnable(job):
+                _report_job_finished(job, jobs, options, callbacks)
+                return success_count
+            _persist_state(job, options, new_attempt=False)
+            job['resumes'] = job.get('resumes', 0) + 1
+            limit_rate = _register_bandwidth(job, options)
+            logging.info(f"Resuming job {job['id']} (attempt {job['resumes'] + 1}) with --continue")
+    finally:
+        if governor: governor.release(job['id'])
+        if job.get('fill_cache'): info_cache.store_written(job['url'], options)
+        if info_json:
+            try: os.remove(info_json)
+            except OSError: pass
+
+def _cached_info(job, options):
+    # Playlists need live enumeration; everything else can come from the info cache.
+    # A miss is not extracted here: the download fills the cache itself (fill_cache)
+    if options['is_playlist']: return None
+    info = info_cache.get_info(job['url'], options, extract=False)
+    job['fill_cache'] = info is None
+    return info
+
+def _materialize_info(info):
+    if not info: return None
+    try:
+        return info_cache.materialize(info)
+    except Exception as e:
+        logging.error(f"Info cache materialize failed: {e}")
+        return None
+
+def _run_job_subprocess(job, jobs, options, callbacks, info_json=None, limit_rate=None):
+    # A running yt-dlp cannot change --limit-rate; redistribution reaches the jobs started later
+    target_folder = options['target_folder']
+    command = build_command(job['url'], options, info_json, limit_rate, job['fragments'], job.get('plan'), job.get('subs'))
+    if job.get('fill_cache'): command[1:1] = info_cache.write_args(job['url'], options)
+    # Reuse the .part / fragment files a pause left behind
+    if job.get('resumes'): command.insert(1, "--continue")
+    if options.get('debug', False): _log_debug_command(command)
+
+    split = bool(job.get('plan') and job['plan'].get('split'))
+    parts = []
+    handed_off = False
+    started = time.monotonic()
+    success_count = 0
+    try:
+        process = subprocess.Popen(
+            command, cwd=target_folder, 
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, 
+            text=True, encoding='utf-8', errors='ignore', **process_tree.popen_kwargs()
+        )
+        with jobs_lock:
+            job['process'] = process
+            # Cancel or pause may have landed between the state check and Popen
+            if job['state'] in ("cancelled", "paused"): process_tree.terminate_tree(process)
         
-        print_template = "after_move:DATA::%(filepath)s::%(title)s::%(duration_string)s::%(filesize,filesize_approx)s"
-        command.extend(["--print", print_template])
+        for event in output_parser.iter_events(process.stdout):
+            if event['type'] == "progress":
+                _apply_progress(event, job, jobs, callbacks)
+            elif event['type'] == "data" and split:
+                parts.append(event)
+            elif event['type'] == "data":
+                _record_download(event, job, options, callbacks)
+                success_count += 1
+            else:
+                _apply_event(event, job)
+        process.wait()
 
-        if options['use_subs']:
-            command.extend(["--write-subs", "--sub-langs", "en,.*"])
+        if process.returncode != 0 and job['state'] != "paused":
+             logging.error(f"Return Code {process.returncode} (job {job['id']})")
+        elif split and parts and job['state'] == "running":
+            pipeline.record("download", time.monotonic() - started)
+            job['stage'] = "post"
+            metrics.mark(job, "postprocess")
+            pipeline.submit(_postprocess_job, job, parts, jobs, options, callbacks)
+            handed_off = True
 
-        if os.path.exists(options['ff_path']): 
-            command.extend(["--ffmpeg-location", options['ff_path']])
+    except Exception as e:
+        logging.critical(f"Critical System Error: {e}")
+    finally:
+        with jobs_lock:
+            job['process'] = None
+            if job['state'] == "running" and not handed_off:
+                job['state'] = "done" if success_count else "failed"
+        # A handed-off job is finished by _postprocess_job, a paused one by _run_job_stages
+        if not handed_off and job['state'] != "paused": _report_job_finished(job, jobs, options, callbacks)
+    return success_count
+
+def _subtitle_files(out, job, options):
+    # [(path, lang)] of the tracks yt-dlp wrote next to the final file, when they are to be embedded
+    if not (options['use_subs'] and options.get('embed_subs')): return []
+    base = os.path.splitext(out)[0]
+    found = []
+    for lang in job.get('subs') or []:
+        paths = glob.glob(glob.escape(base) + f".{lang}.*")
+        if paths: found.append((paths[0], lang))
+    return found
+
+def _postprocess_job(job, parts, jobs, options, callbacks):
+    # Runs on the post-processing pool: merge / extract the downloaded parts with ffmpeg
+    log_setup.set_job(job['id'], options.get('queue_batch'))
+    plan = job['plan']
+    ff = postprocess.ffmpeg_exe(options['ff_path'])
+    absolute = lambda p: p if os.path.isabs(p) else os.path.abspath(os.path.join(options['target_folder'], p))
+    by_format = {}
+    for part in parts:
+        for format_id in (plan.get('video'), plan.get('audio'), plan.get('format')):
+            if format_id and os.path.splitext(part['path'])[0].endswith(f".f{format_id}"):
+                by_format[format_id] = part
+
+    success = 0
+    try:
+        with jobs_lock:
+            if job['state'] != "running": return 0
 
         if options['mode'] == "video":
-            if options['quality'] == "Best Possible": 
-                # Use bv* to include all protocols (DASH/HLS) and prioritize merge
-                fmt = "bv*+ba/b"
-            else:
-                # Added 1080 mapping
-                h = {"144": "144", "240": "240", "360": "360", "720": "720", "1080": "1080", "1440": "1440", "2k": "1440", "4k": "2160"}.get(options['quality'], "720")
-                fmt = f"bv*[height<={h}]+ba/b[height<={h}]"
-            command.extend(["-f", fmt])
-            
-            if "WebM" in options['format']: command.extend(["-S", "vcodec:vp9", "--merge-output-format", "webm"])
-            else: command.extend(["-S", "vcodec:h264", "--merge-output-format", "mp4"])
+            video, audio = by_format[plan['video']], by_format[plan['audio']]
+            out = postprocess.final_path(video['path'], plan['video'], plan['container'])
+            subs = _subtitle_files(absolute(out), job, options)
+            command = postprocess.merge_command(ff, absolute(video['path']), absolute(audio['path']), absolute(out), plan['audio_encoder'],
+                                                subs, subtitles.EMBED_CODEC.get(plan['container']))
+            inputs = [video, audio] + [{"path": path} for path, _ in subs]
         else:
-            # --- ROBUST AUDIO FORMAT LOGIC ---
-            raw_fmt = options['audio_fmt'].lower()
-            
-            # Fuzzy match the format name
-            if "opus" in raw_fmt:
-                tgt = "opus"
-            elif "aac" in raw_fmt:
-                tgt = "aac"
-            elif "m4a" in raw_fmt:
-                tgt = "m4a"
-            elif "vorbis" in raw_fmt:
-                tgt = "vorbis"
-            elif "wav" in raw_fmt:
-                tgt = "wav"
-            else:
-                tgt = "mp3" # Default if nothing else matches
-            
-            # Map Quality
-            if "high" in raw_fmt: q = "0"
-            elif "medium" in raw_fmt: q = "5"
-            else: q = "10"
+            audio = by_format[plan['format']]
+            tgt, q = format_planner.audio_target(options['audio_fmt'])
+            ext = postprocess.PASSTHROUGH_EXT.get(plan['codec'], "mka") if plan['passthrough'] else postprocess.AUDIO_EXT[tgt]
+            out = postprocess.final_path(audio['path'], plan['format'], ext)
+            command = postprocess.audio_command(ff, absolute(audio['path']), absolute(out), tgt, q,
+                                                plan['passthrough'], postprocess.metadata_args(options))
+            inputs = [audio]
 
-            command.extend(["-x", "--audio-format", tgt, "--audio-quality", q])
-            
-            # Metadata args...
-            if options['meta_artist'] or options['meta_album']:
-                meta = ""
-                if options['meta_artist']: meta += f"-metadata artist=\"{options['meta_artist']}\" "
-                if options['meta_album']: meta += f"-metadata album=\"{options['meta_album']}\" "
-                command.extend(["--postprocessor-args", f"ffmpeg:{meta}"])
-
-        command.append(video_url)
-        # --- DEBUGGER MODE ---  #hata belki
-        if options.get('debug', False):
-            cmd_str = " ".join(command)
-            # 1. Log to debug.log
-            logging.info(f"DEBUG COMMAND: {cmd_str}")
-            # 2. Print to VS Code Terminal
-            print(f"\n[DEBUG] Executing:\n{cmd_str}\n")
-            # 3. Save to file for easy reading
-            with open("last_command.txt", "w", encoding="utf-8") as f:
-                f.write(cmd_str)
-        # ---------------------
+        if options.get('debug', False): _log_debug_command(command)
+        if postprocess.run_ffmpeg(command, on_start=lambda p: job.__setitem__('process', p)):
+            for part in inputs:
+                try: os.remove(absolute(part['path']))
+                except OSError: pass
+            _record_download(dict(inputs[0], path=out, size=os.path.getsize(absolute(out))), job, options, callbacks)
+            success = 1
+    except Exception as e:
+        logging.critical(f"Critical System Error: {e}")
+    finally:
+        with jobs_lock:
+            job['process'] = None
+            if job['state'] == "running":
+                job['state'] = "done" if success else "failed"
+        _report_job_finished(job, jobs, options, callbacks)
+        callbacks['status'](_status_line(jobs), "blue")
+        log_setup.set_job(None)
+    return success
 
-        try:
-            current_process = subprocess.Popen(
-                command, cwd=target_folder, 
-                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, 
-                text=True, creationflags=CREATE_NO_WINDOW, encoding='utf-8', errors='ignore'
+def _status_line(jobs):
+    finished = sum(1 for j in jobs if j['state'] in ("done", "failed", "cancelled"))
+    active = sum(1 for j in jobs if j['state'] == "running" and j.get('stage') != "post")
+    msg = f"Processing {finished}/{len(jobs)} ({active} active)..."
+    if pipeline: msg += " | " + pipeline.status()
+    return msg
+
+# --- SINGLE-PROCESS BATCH MODE ---
+# One yt-dlp process works through a --batch-file, so interpreter and extractor
+# startup is paid once. Output is demultiplexed back to jobs: "START::<url>" marks
+# which job the following progress lines belong to, and every DATA line carries
+# the original URL it was produced for.
+def _run_batch_invocation(jobs, options, callbacks):
+    target_folder = options['target_folder']
+    by_url = {j['url']: j for j in jobs}
+    success = {j['id']: 0 for j in jobs}
+
+    fd, batch_path = tempfile.mkstemp(prefix="ytmini_batch_", suffix=".txt")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write("\n".join(j['url'] for j in jobs) + "\n")
+
+    # One process downloads one file at a time, so it gets the whole budget; -N is
+    # fixed for the process, so every job runs with the value chosen for the first URL
+    n = fragments.choose(jobs[0]['url'], options)
+    for job in jobs: job['fragments'] = n
+    logging.info(f"Batch process concurrent fragments: {n}")
+    command = build_command(None, options, limit_rate=governor.current_budget() if governor else None, concurrent_fragments=n)
+    # START goes first so it precedes the same URL's PHASE::download print
+    command[1:1] = ["--print", "before_dl:START::%(original_url)s"]
+    command.extend(["--ignore-errors", "--batch-file", batch_path])
+    if options.get('debug', False): _log_debug_command(command)
+
+    current = None
+    try:
+        with jobs_lock:
+            if batch_cancelled.is_set(): return 0
+            process = subprocess.Popen(
+                command, cwd=target_folder,
+                stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                text=True, encoding='utf-8', errors='ignore', **process_tree.popen_kwargs()
             )
-            
-            while True:
-                line = current_process.stdout.readline()
-                if not line:
-                    if current_process.poll() is not None:
-                        break
-                    continue
-
-                if "[download]" in line and "%" in line:
-                    match = re.search(r"(\d+\.?\d*)%", line)
-                    if match:
-                        try:
-                            percent = float(match.group(1))
-                            callbacks['progress'](percent)
-                        except: pass
-
-                if line.startswith("DATA::"):
-                    parts = line.split("::")
-                    if len(parts) >= 5:
-                        raw_path = parts[1].strip()
-                        
-                        # --- CRITICAL PATH FIX: FORCE ABSOLUTE PATH ---
-                        if not os.path.isabs(raw_path):
-                            full_path = os.path.join(target_folder, raw_path)
-                            # This converts "video.mp4" into "C:\Users\Desktop\video.mp4"
-                            full_path = os.path.abspath(full_path)
-                        else:
-                            full_path = raw_path
-                        # ----------------------------------------------
-
-                        entry = {
-                            "path": full_path,
-                            "title": parts[2].strip(),
-                            "duration": parts[3].strip(),
-                            "size": format_size(parts[4])
-                        }
-                        add_to_history(entry)
-                        callbacks['refresh_history']()
-                        success_count += 1
-                        logging.info(f"Download Success: {video_url}")
-
-            if current_process.returncode != 0:
-                 logging.error(f"Return Code {current_process.returncode}")
+            for job in jobs:
+                job['process'] = process
+                job['shared'] = True
 
-        except Exception as e:
-            logging.critical(f"Critical System Error: {e}")
-        finally:
-            current_process = None
+        for event in output_parser.iter_events(process.stdout):
+            if event['type'] == "start":
+                # Playlist entries report their own URL; they stay with the current job
+                job = by_url.get(event['url'])
+                if job and job is not current:
+                    with jobs_lock:
+                        if current and current['state'] == "running":
+                            current['state'] = "done" if success[current['id']] else "failed"
+                        if job['state'] == "pending": job['state'] = "running"
+                        job.setdefault('started_at', time.time())
+                    # One process extracts and downloads in turn; extraction is counted as queue wait here
+                    metrics.mark(job, "download")
+                    _persist_state(job, options)
+                    if current: _report_job_finished(current, jobs, options, callbacks)
+                    current = job
+                    log_setup.set_job(job['id'], options.get('queue_batch'))
+                    callbacks['status'](f"Processing {job['id']+1}/{len(jobs)}...", "blue")
+                continue
+
+            elif event['type'] == "progress" and current:
+                _apply_progress(event, current, jobs, callbacks)
+
+            elif event['type'] == "data":
+                job = by_url.get(event['url']) or current
+                if job:
+                    _record_download(event, job, options, callbacks)
+                    success[job['id']] += 1
+
+            elif current:
+                _apply_event(event, current)
+        process.wait()
+
+        if process.returncode != 0:
+             logging.error(f"Return Code {process.returncode} (batch process)")
+
+    except Exception as e:
+        logging.critical(f"Critical System Error: {e}")
+    finally:
+        with jobs_lock:
+            for job in jobs:
+                job['process'] = None
+                if job['state'] in ("pending", "running"):
+                    if success[job['id']]: job['state'] = "done"
+                    else: job['state'] = "cancelled" if batch_cancelled.is_set() else "failed"
+        for job in jobs:
+            if job is not current: _persist_state(job, options)
+        if current: _report_job_finished(current, jobs, options, callbacks)
+        else: _report_progress(jobs, callbacks)
+        log_setup.set_job(None)
+        try: os.remove(batch_path)
+        except OSError: pass
+    return sum(success.values())
+
+def _start_batch(options, workers):
+    global governor
+    with jobs_lock:
+        batch_cancelled.clear()
+        batch_interrupted.clear()
+        active_jobs.clear()
+        governor = bandwidth.BandwidthGovernor.from_options(options, slots=workers)
+    last_command_written.clear()
+    log_setup.set_console(options.get('debug', False))
+    batch_paused.clear()
+    # Leftovers of downloads that were never resumed; runs beside the batch
+    threading.Thread(target=sweep_partials, daemon=True,
+                     args=(float(options.get('partial_max_age_hours') or 0),)).start()
+
+def _start_pipeline(options):
+    global pipeline
+    if options.get('pipeline') and postprocess.is_available(options) and not use_api_engine(options):
+        pipeline = postprocess.Pipeline()
+        logging.info(f"Post-processing pipeline: {pipeline.workers} workers")
+
+def _end_batch():
+    global governor, pipeline
+    with jobs_lock:
+        active_jobs.clear()
+        governor = None
+        pipeline = None
+
+def _summary(jobs, skipped):
+    # Returned for headless callers (cli.py) that need exact counts
+    return {
+        "total": len(jobs),
+        "succeeded": sum(1 for j in jobs if j['state'] == "done"),
+        "failed": sum(1 for j in jobs if j['state'] == "failed"),
+        "cancelled": sum(1 for j in jobs if j['state'] == "cancelled"),
+        "skipped": skipped,
+    }
+
+# --- PLAYLIST SYNC ---
+# Each playlist is listed by playlist_sync, and every new entry becomes a job the
+# moment it is listed, so the first downloads run while the listing continues.
+# The queue batch holds the playlist URLs; an interrupted sync is simply run again.
+def _run_sync(playlists, options, callbacks):
+    workers = max(1, int(options.get('workers', 1)))
+    jobs = []
+    _start_batch(options, workers)
+    _start_pipeline(options)
+    logging.info(f"Starting sync of {len(playlists)} playlist(s). Mode: {options['mode']}, Workers: {workers}")
+    callbacks['status']("Listing playlist...", "blue")
+    callbacks['progress'](0)
+
+    success_count = 0
+    skipped = 0
+    sync_states = [] # per playlist; written once its jobs are done
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ytdlp-job") as pool:
+        futures = []
+        for url in playlists:
+            sync = playlist_sync.PlaylistSync(url, options)
+            state = {"url": url, "state": "running"}
+            _persist_state(state, options)
+            try:
+                for entry in sync.entries():
+                    if batch_cancelled.is_set(): break
+                    job = {"id": len(jobs), "url": entry['url'], "state": "pending", "process": None, "percent": 0.0,
+                           "playlist": url, "video_id": entry['id']}
+                    metrics.start(job)
+                    with jobs_lock:
+                        jobs.append(job)
+                        active_jobs[job['id']] = job
+                    futures.append(pool.submit(_run_job, job, jobs, sync.job_options(entry), callbacks))
+                    callbacks['status'](f"{_status_line(jobs)} | listing {sync.title or url}", "blue")
+                state['state'] = "cancelled" if batch_cancelled.is_set() else "done"
+            except Exception as e:
+                logging.error(f"Sync Listing Error ({url}): {e}")
+                state['state'] = "failed"
+            state['sync'] = sync
+            skipped += len(sync.archived)
+            sync_states.append(state)
+
+        for future in as_completed(futures):
+            try:
+                success_count += future.result()
+            except Exception as e:
+                logging.critical(f"Critical System Error: {e}")
+            callbacks['status'](_status_line(jobs), "blue")
+        if pipeline: success_count += pipeline.drain()
+
+    _end_batch()
+    for state in sync_states:
+        own = [j for j in jobs if j['playlist'] == state['url']]
+        completed = state['state'] == "done" and not any(j['state'] == "cancelled" for j in own)
+        state['sync'].finish([j['video_id'] for j in own if j['state'] == "done"], completed)
+        if state['state'] == "done" and not completed: state['state'] = "cancelled"
+        _persist_state(state, options)
+    job_queue.close_batch(options['queue_batch'])
+
+    skipped_note = f" ({skipped} already downloaded, skipped)" if skipped else ""
+    if not jobs: callbacks['finish'](True, f"Playlist is up to date{skipped_note}.")
+    elif success_count >= len(jobs): callbacks['finish'](True, f"Synced {len(jobs)} new entries!{skipped_note}")
+    elif success_count > 0: callbacks['finish'](True, f"Synced {success_count}/{len(jobs)} new entries{skipped_note}")
+    else: callbacks['finish'](False, f"Sync failed or cancelled.{skipped_note}")
+    return _summary(jobs, skipped)
+
+def run_download_logic(urls, options, callbacks):
+    # A limit that does not parse must not silently become "unlimited"
+    try:
+        bandwidth.parse_rate(options.get('bandwidth_limit'))
+    except ValueError as e:
+        logging.error(f"Bandwidth Error: {e}")
+        callbacks['finish'](False, str(e))
+        return None
+    # Collapse equivalent URLs and drop videos the archive already has
+    urls, skipped_urls = archive.prepare_urls(urls, skip_archived=options.get('skip_archived', True),
+                                              playlist=options.get('is_playlist', False), variant=archive.output_variant(options))
+    skipped = len(skipped_urls)
+    skipped_note = f" ({skipped} already downloaded, skipped)" if skipped else ""
+
+    # Persist the batch before anything runs; a resumed batch already has an id
+    if not options.get('queue_batch'):
+        batch_id = job_queue.create_batch(urls + skipped_urls, options)
+        options = dict(options, queue_batch=batch_id)
+    # Resumed batches too: a row archived since it was queued would otherwise stay pending forever
+    for url in skipped_urls: job_queue.set_state(options['queue_batch'], url, "skipped")
+
+    if not urls:
+        job_queue.close_batch(options['queue_batch'])
+        callbacks['finish'](skipped > 0, f"Nothing to download{skipped_note}.")
+        return {"total": 0, "succeeded": 0, "failed": 0, "cancelled": 0, "skipped": skipped}
+    if options.get('sync') and options.get('is_playlist'):
+        return _run_sync(urls, options, callbacks)
+
+    total_count = len(urls)
+    workers = max(1, min(int(options.get('workers', 1)), total_count or 1))
+
+    jobs = [{"id": i, "url": u, "state": "pending", "process": None, "percent": 0.0} for i, u in enumerate(urls)]
+    for job in jobs: metrics.start(job)
+    _start_batch(options, workers)
+    with jobs_lock: active_jobs.update({j['id']: j for j in jobs})
+
+    logging.info(f"Starting batch of {total_count} downloads. Mode: {options['mode']}, Workers: {workers}, Single process: {bool(options.get('batch_mode'))}")
+    callbacks['status'](f"Processing 0/{total_count}...", "blue")
+    callbacks['progress'](0)
+
+    success_count = 0
+    # The API engine has no per-process startup cost, so batch mode only applies to subprocesses
+    if options.get('batch_mode') and total_count > 1 and not use_api_engine(options):
+        success_count = _run_batch_invocation(jobs, options, callbacks)
+    else:
+        _start_pipeline(options)
+        prefetch = None
+        if options.get('prefetch') and not options['is_playlist'] and total_count > workers:
+            # Extract metadata for queued URLs while the first jobs download
+            prefetch = info_cache.start_prefetch(urls[workers:], options)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ytdlp-job") as pool:
+            futures = [pool.submit(_run_job, job, jobs, options, callbacks) for job in jobs]
+            for future in as_completed(futures):
+                try:
+                    success_count += future.result()
+                except Exception as e:
+                    logging.critical(f"Critical System Error: {e}")
+                callbacks['status'](_status_line(jobs), "blue")
+        if prefetch: prefetch.shutdown(wait=False, cancel_futures=True)
+        # Downloads are done; wait for the files still being merged / converted
+        if pipeline: success_count += pipeline.drain()
+
+    _end_batch()
+    # Jobs that never started (cancelled while pending) still need their final state
+    for job in jobs:
+        if job['state'] == "cancelled": _persist_state(job, options)
+    job_queue.close_batch(options['queue_batch'])
+
+    if success_count >= total_count: callbacks['finish'](True, f"All Downloads Complete!{skipped_note}")
+    elif success_count > 0: callbacks['finish'](True, f"Completed {success_count}/{total_count}{skipped_note}")
+    else: callbacks['finish'](False, f"Downloads failed or cancelled.{skipped_note}")
 
-    if success_count == total_count: callbacks['finish'](True, "All Downloads Complete!")
-    elif success_count > 0: callbacks['finish'](True, f"Completed {success_count}/{total_count}")
-    else: callbacks['finish'](False, "Downloads failed or cancelled.")
\ No newline at end of file
+    return _summary(jobs, skipped)
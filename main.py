@@ -1,12 +1,28 @@
+import time
+_startup_t0 = time.perf_counter()
+import logging
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
 import tkinter as tk
 import threading
 import os
 import config
+import event_bus
+import store
+import job_queue
+import archive
+import dedupe
+import notify
 import logic
+import tools
 import ui_helpers
 
+# Startup milestones go to debug.log (imports -> layout -> first paint)
+def mark_startup(milestone):
+    logging.info(f"Startup: {milestone} at {(time.perf_counter() - _startup_t0) * 1000:.0f} ms")
+
+mark_startup("imports")
+
 # --- SETUP CUSTOMTKINTER ---
 ctk.set_appearance_mode("Dark")  # Default mode
 ctk.set_default_color_theme("blue")  # Themes: "blue", "green", "dark-blue"
@@ -16,7 +32,23 @@ app_config = config.load_config()
 current_mode = app_config.get("theme", "dark").title() # "Dark" or "Light"
 ctk.set_appearance_mode(current_mode)
 batch_urls = []
+UI_FRAME_MS = 66 # ~15 Hz UI refresh while downloading
+ui_bus = event_bus.UIEventBus()
+last_status = None
+ENGINE_LABELS = {"subprocess": "yt-dlp executable", "api": "Python API (yt_dlp)"}
+
 
+# --- STARTUP ---
+def on_first_paint():
+    mark_startup("first paint")
+    # Heavier work waits until the window is on screen
+    threading.Thread(target=load_history_background, daemon=True).start()
+    app.after(500, offer_resume)
+
+def load_history_background():
+    # Opening the store may run the one-time history.json migration; keep it off the Tk thread
+    store.count_history()
+    ui_bus.refresh_history()
 
 # --- TOOLTIPS WRAPPER (CTK doesn't have native tooltips yet) ---
 # We reuse the one from ui_helpers but attach it to CTK widgets
@@ -91,9 +123,11 @@ def load_batch_file():
     fp = filedialog.askopenfilename(filetypes=[("Text Files", "*.txt")])
     if fp:
         with open(fp, "r") as f:
-            lines = f.readlines()
-            batch_urls.extend(lines)
-            lbl_batch_status.configure(text=f"Loaded {len(lines)} URLs", text_color="green")
+            lines = [l.strip() for l in f if l.strip() and not l.lstrip().startswith("#")]
+        # Drop duplicates (also against what is already loaded), keep file order
+        new = [u for u in dict.fromkeys(lines) if u not in batch_urls]
+        batch_urls.extend(new)
+        lbl_batch_status.configure(text=f"Loaded {len(new)} URLs", text_color="green")
 
 def update_progress(val):
     # Ensure val is between 0 and 100, then divide for CTK (0.0 to 1.0)
@@ -118,9 +152,15 @@ def start_download_thread():
         return
 
     yt_path = app_config["ytdlp_path"]
-    if not os.path.exists(yt_path):
+    api_ready = app_config.get("engine") == "api" and logic.api_engine.is_available()
+    if not api_ready and not os.path.exists(yt_path):
         lbl_status.configure(text="Error: yt-dlp path invalid (Check Settings)", text_color="red")
         return
+    try:
+        logic.bandwidth.parse_rate(app_config.get("bandwidth_limit", ""))
+    except ValueError as e:
+        lbl_status.configure(text=f"Error: {e} (bandwidth_limit in config.txt)", text_color="red")
+        return
 
     # Map friendly names back to config values
     quality_map = {"Best": "Best Possible"} 
@@ -138,26 +178,98 @@ def start_download_thread():
         'quality': quality_map.get(combo_quality.get(), combo_quality.get()),
         'audio_fmt': combo_audio.get(),
         'meta_artist': entry_artist.get().strip() if var_metadata.get() else "",
-        'meta_album': entry_album.get().strip() if var_metadata.get() else ""
+        'meta_album': entry_album.get().strip() if var_metadata.get() else "",
+        'workers': int(app_config.get("max_workers") or 1),
+        'batch_mode': var_batch_mode.get() if var_advanced.get() else False,
+        'engine': app_config.get("engine", "subprocess"),
+        'skip_archived': var_skip_archived.get(),
+        'info_cache_ttl': int(app_config.get("info_cache_ttl_minutes") or 0),
+        'info_cache_max_mb': int(app_config.get("info_cache_max_mb") or 200),
+        'prefetch': app_config.get("info_prefetch") == "1",
+        'bandwidth_limit': app_config.get("bandwidth_limit", ""),
+        'bandwidth_profile': app_config.get("bandwidth_profile", ""),
+        'fragments': app_config.get("concurrent_fragments", "auto"),
+        'pipeline': app_config.get("pipeline_postprocess") == "1",
+        'metrics_format': app_config.get("metrics_format", ""),
+        'partial_max_age_hours': float(app_config.get("partial_max_age_hours") or 0),
+        'sub_langs': app_config.get("subtitle_langs", "en,orig"),
+        'embed_subs': var_embed_subs.get(),
+        'sync': var_sync.get() if var_advanced.get() else False,
+        'sync_stop_after': int(app_config.get("sync_stop_after") or 10),
+        'dedupe': app_config.get("dedupe", "1") == "1"
     }
 
+    launch_download(all_urls, options)
+
+def launch_download(urls, options):
     btn_download.configure(text="CANCEL", fg_color="red", hover_color="darkred", command=cancel_process)
+    btn_pause.configure(text="PAUSE", command=pause_process)
+    btn_pause.pack(side="bottom", pady=(0, 5), before=btn_download)
     progress_bar.set(0)
     
-    callbacks = {
-        'status': lambda msg, col: app.after(0, lambda: lbl_status.configure(text=msg, text_color=col if col != "blue" else ("#1f6aa5" if current_mode=="Light" else "#4da6ff"))),
-        'progress': lambda val: app.after(0, lambda: update_progress(val)),
-        'refresh_history': lambda: app.after(0, refresh_history_ui),
-        'finish': lambda success, msg: app.after(0, lambda: finish_ui_reset(success, msg))
-    }
-
-    threading.Thread(target=logic.run_download_logic, args=(all_urls, options, callbacks), daemon=True).start()
+    # Worker threads only write to the bus; pump_ui_events applies it to the widgets
+    callbacks = ui_bus.callbacks()
+
+    threading.Thread(target=logic.run_download_logic, args=(urls, options, callbacks), daemon=True).start()
+
+def offer_resume():
+    # A batch left unfinished by a crash or reboot is picked up where it stopped
+    pending = job_queue.unfinished_batch()
+    if not pending: return
+    batch_id, urls, options = pending
+    if messagebox.askyesno("Resume Downloads", f"{len(urls)} download(s) from the last session did not finish.\n\nResume them now?"):
+        options['queue_batch'] = batch_id
+        launch_download(urls, options)
+    else:
+        job_queue.discard_batch(batch_id)
+
+def set_status(msg, col):
+    lbl_status.configure(text=msg, text_color=col if col != "blue" else ("#1f6aa5" if current_mode=="Light" else "#4da6ff"))
+
+def pump_ui_events():
+    # One batched UI update per frame, whatever the workers pushed in between
+    global last_status
+    update = ui_bus.drain()
+    if update["progress"] is not None:
+        update_progress(update["progress"])
+    if update["status"]:
+        last_status = update["status"]
+    if update["finish"]:
+        finish_ui_reset(*update["finish"]) # also refreshes history
+    else:
+        if last_status and (update["status"] or update["jobs"]):
+            msg, col = last_status
+            speed = sum(e.get("speed") or 0 for e in update["jobs"].values())
+            if speed: msg += f"  ({logic.format_size(speed)}/s)"
+            set_status(msg, col)
+        if update["refresh_history"]:
+            refresh_history_ui()
+        else:
+            for entry in update["new_history"]:
+                history_panel.insert_top(entry)
+    app.after(UI_FRAME_MS, pump_ui_events)
 
+# Through the bus, so the next frame does not repaint the last worker status over them
 def cancel_process():
     if logic.cancel_download():
-        lbl_status.configure(text="Cancelling...", text_color="orange")
+        ui_bus.status("Cancelling...", "orange")
+
+def pause_process():
+    if logic.pause_download():
+        btn_pause.configure(text="RESUME", command=resume_process)
+        ui_bus.status("Paused (partial files are kept)", "orange")
+    else:
+        ui_bus.status("Pause is not available in Batch Mode", "orange")
+
+def resume_process():
+    logic.resume_download()
+    btn_pause.configure(text="PAUSE", command=pause_process)
+    ui_bus.status("Resuming...", "orange")
 
 def finish_ui_reset(success, msg):
+    global last_status
+    last_status = None
+    btn_pause.pack_forget()
     lbl_status.configure(text=msg, text_color="green" if success else "red")
     btn_download.configure(text="EXECUTE DOWNLOAD", fg_color=["#3B8ED0", "#1F6AA5"], hover_color=["#36719F", "#144870"], command=start_download_thread)
     batch_urls.clear()
@@ -167,42 +279,13 @@ def finish_ui_reset(success, msg):
 
 # --- HISTORY ---
 def refresh_history_ui():
-    # CustomTkinter scrollable frame cleanup
-    for widget in scroll_history.winfo_children():
-        widget.destroy()
-
-    history = config.load_history()
-
-    if not history:
-        ctk.CTkLabel(scroll_history, text="No recent downloads.", font=("Arial", 12, "italic"), text_color="gray").pack(pady=20)
-        return
-
-    for item in history:
-        # Create a Card Frame
-        card = ctk.CTkFrame(scroll_history, fg_color=("gray90", "gray20"))
-        card.pack(fill="x", padx=5, pady=5)
-        
-        # Info Column
-        info_col = ctk.CTkFrame(card, fg_color="transparent")
-        info_col.pack(side="left", fill="both", expand=True, padx=10, pady=5)
-        
-        # Clickable Title
-        title_btn = ctk.CTkButton(info_col, text=item["title"], anchor="w", fg_color="transparent", 
-                                  text_color=("black", "white"), hover=False, font=("Arial", 12, "bold"),
-                                  command=lambda p=item["path"]: logic.open_file_safe(p))
-        title_btn.pack(fill="x")
-        
-        ctk.CTkLabel(info_col, text=f"{item['duration']}  |  {item['size']}", anchor="w", font=("Arial", 10), text_color="gray").pack(fill="x")
+    # Full re-sync from the store (one paged query); per-download updates use insert_top
+    history_panel.reload()
+    refresh_reclaimed()
 
-        # Action Buttons Column
-        btn_col = ctk.CTkFrame(card, fg_color="transparent")
-        btn_col.pack(side="right", padx=10)
-        
-        ctk.CTkButton(btn_col, text="📂", width=40, height=30, fg_color="transparent", border_width=1, border_color="gray", text_color=("black", "white"),
-                      command=lambda p=item["path"]: logic.open_folder_safe(p)).pack(side="left", padx=2)
-        
-        ctk.CTkButton(btn_col, text="🗑️", width=40, height=30, fg_color="#ffdddd", hover_color="#ffcccc", text_color="red",
-                      command=lambda i=item: delete_ui_action(i)).pack(side="left", padx=2)
+def refresh_reclaimed():
+    reclaimed = dedupe.total_reclaimed()
+    lbl_reclaimed.configure(text=f"{logic.format_size(reclaimed)} saved by dedupe" if reclaimed else "")
 
 def delete_ui_action(entry):
     file_path = entry['path']
@@ -214,76 +297,68 @@ def delete_ui_action(entry):
             except OSError as e:
                 messagebox.showerror("Cannot Delete", f"Could not delete the file.\n\nMake sure the video is CLOSED.\n\nError: {e}")
                 return 
-        hist = config.load_history()
-        hist = [x for x in hist if x['path'] != file_path]
-        config.save_history_list(hist)
-        refresh_history_ui()
+        store.delete_from_history(file_path)
+        archive.remove_path(file_path)
+        dedupe.remove_path(file_path)
+        history_panel.remove(file_path)
+        refresh_reclaimed()
 
 def delete_all_action():
-    if not config.load_history(): return 
+    if not store.count_history(): return 
     if messagebox.askyesno("Clear History", "Clear history list?\n(Files stay on disk)"):
-        config.save_history_list([])
+        store.clear_history()
         refresh_history_ui()
 
 # --- SETTINGS LOGIC ---
 def do_autodetect():
+    # Scanning and --version probes run in the background; results come back via app.after
+    btn_autodetect.configure(state="disabled", text="🔍 Detecting...")
+    tools.discover_async(lambda found: app.after(0, lambda: apply_autodetect(found)))
+
+def apply_autodetect(found):
+    btn_autodetect.configure(state="normal", text="🔍 Auto-Detect Paths")
+
     # 1. Detect yt-dlp
-    yt = logic.auto_detect_ytdlp()
+    yt = tools.select_best(found["yt-dlp"], tools.score_ytdlp)
     if yt: 
-        entry_ytdlp.delete(0, "end"); entry_ytdlp.insert(0, yt)
+        entry_ytdlp.delete(0, "end"); entry_ytdlp.insert(0, yt["path"])
     
-    # 2. Detect FFmpeg (Targeting Gyan Shared)
-    ff_list = logic.get_all_ffmpeg_paths()
-    if ff_list:
+    # 2. Detect FFmpeg (Targeting Gyan Shared, see tools.score_ffmpeg)
+    ff_list = [t["path"] for t in found["ffmpeg"]]
+    ff = tools.select_best(found["ffmpeg"], tools.score_ffmpeg)
+    if ff:
         combo_ffmpeg.configure(values=ff_list)
-        
-        best_choice = None
-        
-        # LEVEL 1: The "Gold Standard" (Gyan + Shared)
-        # This fixes your specific issue by prioritizing the full shared build
-        for p in ff_list:
-            if "solidworks" in p.lower(): continue
-            if "gyan" in p.lower() and "shared" in p.lower():
-                best_choice = p
-                break
-        
-        # LEVEL 2: Fallback to any Gyan or Full Build if Shared not found
-        if not best_choice:
-            for p in ff_list:
-                if "solidworks" in p.lower(): continue
-                if "gyan" in p.lower() or "full" in p.lower():
-                    best_choice = p
-                    break
-                    
-        # LEVEL 3: Take whatever is left (Winget/Bin), excluding SolidWorks
-        if not best_choice:
-            for p in ff_list:
-                if "solidworks" not in p.lower():
-                    best_choice = p
-                    break
-        
-        # Final Fallback
-        if not best_choice: 
-            best_choice = ff_list[0]
-
+        best_choice = ff["path"]
         combo_ffmpeg.set(best_choice)
         messagebox.showinfo("Success", f"Found {len(ff_list)} paths.\nSelected: {os.path.basename(os.path.dirname(best_choice))}")
-    else: 
+    elif yt:
         messagebox.showinfo("Result", "yt-dlp found, but FFmpeg missing.")
+    else:
+        messagebox.showinfo("Result", "Neither yt-dlp nor FFmpeg was found.")
         
 def do_save_settings():
     app_config["ytdlp_path"] = entry_ytdlp.get().strip()
     app_config["ffmpeg_path"] = combo_ffmpeg.get().strip()
+    app_config["engine"] = "api" if combo_engine.get() == ENGINE_LABELS["api"] else "subprocess"
     config.save_config(app_config)
     show_main()
 
 def show_settings():
+    # Built on first use only; later visits just reload the current values
+    if frame_settings is None:
+        t0 = time.perf_counter()
+        build_settings_screen()
+        logging.info(f"Startup: settings screen built lazily in {(time.perf_counter() - t0) * 1000:.0f} ms")
+    else:
+        entry_ytdlp.delete(0, "end"); entry_ytdlp.insert(0, app_config["ytdlp_path"])
+        combo_ffmpeg.set(app_config["ffmpeg_path"])
+        combo_engine.set(ENGINE_LABELS.get(app_config.get("engine"), ENGINE_LABELS["subprocess"]))
     frame_main.pack_forget()
     frame_settings.pack(fill="both", expand=True)
 
-    # Clear previous widgets
-    for widget in frame_settings.winfo_children():
-        widget.destroy()
+def build_settings_screen():
+    global frame_settings
+    frame_settings = ctk.CTkFrame(app, fg_color="transparent")
 
     ctk.CTkLabel(frame_settings, text="First Time Setup", font=("Arial", 22, "bold")).pack(pady=(20, 10))
 
@@ -320,6 +395,15 @@ def show_settings():
     combo_ffmpeg.set(app_config["ffmpeg_path"])
     combo_ffmpeg.pack(side="left", fill="x", expand=True)
 
+    fs_eng = ctk.CTkFrame(frame_settings, fg_color="transparent")
+    fs_eng.pack(fill="x", padx=40, pady=5)
+    ctk.CTkLabel(fs_eng, text="Engine:", width=80, anchor="w").pack(side="left")
+    global combo_engine
+    combo_engine = ctk.CTkOptionMenu(fs_eng, values=list(ENGINE_LABELS.values()))
+    combo_engine.set(ENGINE_LABELS.get(app_config.get("engine"), ENGINE_LABELS["subprocess"]))
+    combo_engine.pack(side="left", fill="x", expand=True)
+    add_tooltip(combo_engine, config.TOOLTIPS["engine"])
+
     # Install Buttons
     fs_inst = ctk.CTkFrame(frame_settings, fg_color="transparent")
     fs_inst.pack(pady=10)
@@ -327,7 +411,10 @@ def show_settings():
     ctk.CTkButton(fs_inst, text="⬇ Install FFmpeg", width=140, command=lambda: logic.install_via_winget("Gyan.FFmpeg")).pack(side="left", padx=10)
 
     # Action Buttons
-    ctk.CTkButton(frame_settings, text="🔍 Auto-Detect Paths", width=200, fg_color="#3B8ED0", command=do_autodetect).pack(pady=10)
+    global btn_autodetect
+    btn_autodetect = ctk.CTkButton(frame_settings, text="🔍 Auto-Detect Paths", width=200, fg_color="#3B8ED0", command=do_autodetect)
+    btn_autodetect.pack(pady=10)
+    ctk.CTkButton(frame_settings, text="Check Updates", width=200, fg_color="gray", command=lambda: logic.update_tools(entry_ytdlp.get())).pack()
     
     ctk.CTkButton(frame_settings, text="✅ Save & Return", width=200, height=40, fg_color="green", hover_color="darkgreen", command=do_save_settings).pack(pady=(20, 10))
     ctk.CTkButton(frame_settings, text="Cancel", width=200, fg_color="transparent", border_width=1, text_color=("black", "white"), command=show_main).pack()
@@ -337,18 +424,20 @@ def show_settings():
 
 
 def show_main():
-    frame_settings.pack_forget()
+    if frame_settings is not None: frame_settings.pack_forget()
     frame_main.pack(fill="both", expand=True)
     app_config.update(config.load_config())
     update_alert_visibility()
 
 def do_reset():
     if messagebox.askyesno("Reset", "Delete all settings?"):
+        store.close_connection()
         config.factory_reset(); app.destroy(); os._exit(0)
 
 # ================= LAYOUT =================
 # ================= LAYOUT =================
 app = ctk.CTk()
+notify.set_notifier(notify.TkNotifier())
 app.title(f"yt-mini v{config.VERSION}")
 
 # 1. Set the Start Size
@@ -418,8 +507,12 @@ chk_pl.pack(side="left", padx=(0, 10))
 add_tooltip(chk_pl, config.TOOLTIPS["playlist"])
 var_subs = ctk.BooleanVar()
 chk_s = ctk.CTkCheckBox(opt_cont, text="Download Subtitles", variable=var_subs)
-chk_s.pack(side="left")
+chk_s.pack(side="left", padx=(0, 10))
 add_tooltip(chk_s, config.TOOLTIPS["subs"])
+var_embed_subs = ctk.BooleanVar(value=app_config.get("embed_subs") == "1")
+chk_es = ctk.CTkCheckBox(opt_cont, text="Embed Subtitles", variable=var_embed_subs)
+chk_es.pack(side="left")
+add_tooltip(chk_es, config.TOOLTIPS["embed_subs"])
 
 # Advanced Toggle
 var_advanced = ctk.BooleanVar()
@@ -435,6 +528,18 @@ entry_template.pack(fill="x", padx=10, pady=5)
 ctk.CTkButton(frame_advanced_options, text="Import .txt (Batch)", command=load_batch_file).pack(pady=5)
 lbl_batch_status = ctk.CTkLabel(frame_advanced_options, text="", text_color="green")
 lbl_batch_status.pack()
+var_skip_archived = ctk.BooleanVar(value=app_config.get("skip_archived") != "0")
+chk_skip = ctk.CTkCheckBox(frame_advanced_options, text="Skip Already Downloaded Videos", variable=var_skip_archived)
+chk_skip.pack(anchor="w", padx=10, pady=(0, 5))
+add_tooltip(chk_skip, config.TOOLTIPS["skip_archived"])
+var_batch_mode = ctk.BooleanVar(value=app_config.get("batch_mode") == "1")
+chk_batch = ctk.CTkCheckBox(frame_advanced_options, text="Single yt-dlp Process (Faster Batches)", variable=var_batch_mode)
+chk_batch.pack(anchor="w", padx=10, pady=(0, 5))
+add_tooltip(chk_batch, config.TOOLTIPS["batch_mode"])
+var_sync = ctk.BooleanVar()
+chk_sync = ctk.CTkCheckBox(frame_advanced_options, text="Sync Playlist (Only New Entries)", variable=var_sync)
+chk_sync.pack(anchor="w", padx=10, pady=(0, 5))
+add_tooltip(chk_sync, config.TOOLTIPS["sync"])
 
 # Mode Selection
 var_mode = ctk.StringVar(value="video")
@@ -489,42 +594,29 @@ lbl_status.pack(side="bottom", pady=5)
 
 btn_download = ctk.CTkButton(frame_main, text="EXECUTE DOWNLOAD", height=45, font=("Arial", 14, "bold"), command=start_download_thread)
 btn_download.pack(side="bottom", pady=10)
+btn_pause = ctk.CTkButton(frame_main, text="PAUSE", height=30, fg_color="gray", hover_color="#555555", command=lambda: pause_process()) # shown while downloading
 
 # History List
 hist_head = ctk.CTkFrame(frame_main, fg_color="transparent")
 hist_head.pack(side="top", fill="x", padx=20, pady=(10, 5))
 ctk.CTkLabel(hist_head, text="Recent Downloads", font=("Arial", 14, "bold")).pack(side="left")
+lbl_reclaimed = ctk.CTkLabel(hist_head, text="", font=("Arial", 11), text_color="gray")
+lbl_reclaimed.pack(side="left", padx=10)
 ctk.CTkButton(hist_head, text="Clear History", width=80, fg_color="transparent", border_width=1, border_color="red", text_color="red", hover_color="#ffdddd", command=delete_all_action).pack(side="right")
 
-scroll_history = ctk.CTkScrollableFrame(frame_main, label_text="")
-scroll_history.pack(side="top", fill="both", expand=True, padx=20, pady=(0, 10))
+history_panel = ui_helpers.VirtualHistoryList(
+    frame_main, fetch=lambda limit, offset: store.load_history(limit=limit, offset=offset), count=store.count_history,
+    open_file_cmd=logic.open_file_safe, open_folder_cmd=logic.open_folder_safe, delete_cmd=delete_ui_action)
+history_panel.pack(side="top", fill="both", expand=True, padx=20, pady=(0, 10))
 
 # --- SETTINGS SCREEN ---
-frame_settings = ctk.CTkFrame(app, fg_color="transparent")
-ctk.CTkLabel(frame_settings, text="Settings & Setup", font=("Arial", 20, "bold")).pack(pady=30)
-ctk.CTkLabel(frame_settings, text="Use 'Auto-Detect' to find installed tools.", text_color="gray").pack()
-
-fs_yt = ctk.CTkFrame(frame_settings, fg_color="transparent"); fs_yt.pack(fill="x", padx=40, pady=10)
-ctk.CTkLabel(fs_yt, text="yt-dlp:", width=80, anchor="w").pack(side="left")
-entry_ytdlp = ctk.CTkEntry(fs_yt); entry_ytdlp.insert(0, app_config["ytdlp_path"]); entry_ytdlp.pack(side="left", fill="x", expand=True)
-
-fs_ff = ctk.CTkFrame(frame_settings, fg_color="transparent"); fs_ff.pack(fill="x", padx=40, pady=10)
-ctk.CTkLabel(fs_ff, text="FFmpeg:", width=80, anchor="w").pack(side="left")
-combo_ffmpeg = ctk.CTkComboBox(fs_ff, values=[app_config["ffmpeg_path"]]); combo_ffmpeg.set(app_config["ffmpeg_path"]); combo_ffmpeg.pack(side="left", fill="x", expand=True)
-
-fs_inst = ctk.CTkFrame(frame_settings, fg_color="transparent"); fs_inst.pack(pady=20)
-ctk.CTkButton(fs_inst, text="Install yt-dlp", command=lambda: logic.install_via_winget("yt-dlp")).pack(side="left", padx=10)
-ctk.CTkButton(fs_inst, text="Install FFmpeg", command=lambda: logic.install_via_winget("Gyan.FFmpeg")).pack(side="left", padx=10)
-
-ctk.CTkButton(frame_settings, text="Auto-Detect Paths", width=200, command=do_autodetect).pack(pady=10)
-ctk.CTkButton(frame_settings, text="Check Updates", width=200, fg_color="gray", command=lambda: logic.update_tools(entry_ytdlp.get())).pack(pady=10)
-
-ctk.CTkButton(frame_settings, text="Save & Return", width=200, height=40, fg_color="green", hover_color="darkgreen", command=do_save_settings).pack(pady=30)
-ctk.CTkButton(frame_settings, text="Cancel", width=200, fg_color="transparent", border_width=1, text_color=("black", "white"), command=show_main).pack()
-ctk.CTkButton(frame_settings, text="⚠️ Factory Reset", fg_color="transparent", text_color="red", hover_color="#ffdddd", command=do_reset).pack(side="bottom", pady=20)
+frame_settings = None # built lazily by show_settings()
 
 # Init
 update_vis()
-refresh_history_ui()
 update_alert_visibility()
+mark_startup("layout")
+pump_ui_events()
+# First paint: after_idle runs once Tk has drawn the pending window contents
+app.after_idle(lambda: app.after(0, on_first_paint))
 app.mainloop()
\ No newline at end of file
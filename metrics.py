@@ -0,0 +1,116 @@
+import os
+import json
+import time
+import logging
+import threading
+from config import METRICS_PROM_FILE, METRICS_JSONL_FILE
+
+# --- PHASE TIMING ---
+# Every job walks through: queue -> extract -> download -> postprocess -> history.
+# Phases are switched from yt-dlp's "PHASE::" prints, its [download]/[Merger]/...
+# lines (when visible), engine hooks and the scheduler itself. A phase entered
+# twice (playlists) accumulates. The times (seconds) are stored with the history
+# entry under "phases" and aggregated here for export.
+
+PHASES = ("queue", "extract", "download", "postprocess", "history")
+
+# yt-dlp log prefixes that imply a phase; anything else in brackets is an extractor
+_LINE_PHASES = {
+    "[download]": "download", "[dashsegments]": "download", "[hlsnative]": "download",
+    "[ism]": "download", "[f4m]": "download", "[http]": "download",
+    "[Merger]": "postprocess", "[ExtractAudio]": "postprocess", "[VideoConvertor]": "postprocess",
+    "[VideoRemuxer]": "postprocess", "[Metadata]": "postprocess", "[EmbedSubtitle]": "postprocess",
+    "[FixupM3u8]": "postprocess", "[FixupM4a]": "postprocess", "[MoveFiles]": "postprocess",
+}
+
+def phase_for_line(line):
+    if not line.startswith("["): return None
+    prefix = line.split("]", 1)[0] + "]"
+    if prefix in _LINE_PHASES: return _LINE_PHASES[prefix]
+    if prefix in ("[info]", "[debug]"): return None
+    return "extract" # [youtube], [generic], [vimeo], ...
+
+def start(job):
+    job['phases'] = {}
+    job['phase'] = ("queue", time.monotonic())
+
+def mark(job, phase):
+    current = job.get('phase')
+    if current is None or current[0] == phase: return
+    now = time.monotonic()
+    job['phases'][current[0]] = job['phases'].get(current[0], 0.0) + now - current[1]
+    job['phase'] = (phase, now)
+
+def close(job):
+    mark(job, None) # closes the running phase
+    job['phase'] = None
+
+def snapshot(job):
+    """Phase durations so far, including the running one, rounded to ms."""
+    phases = dict(job.get('phases') or {})
+    current = job.get('phase')
+    if current and current[0]:
+        phases[current[0]] = phases.get(current[0], 0.0) + time.monotonic() - current[1]
+    return {p: round(phases[p], 3) for p in PHASES if p in phases}
+
+# --- AGGREGATES / EXPORT ---
+# metrics_format=prometheus rewrites METRICS_PROM_FILE (node_exporter textfile
+# format) after every job; metrics_format=jsonl appends one line per job to
+# METRICS_JSONL_FILE. Counters cover the lifetime of the process.
+
+BUCKETS = (0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+_lock = threading.Lock()
+_jobs_total = {}
+_bytes_total = 0
+_histograms = {}
+
+def _observe(phase, seconds):
+    h = _histograms.setdefault(phase, {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0})
+    for i, le in enumerate(BUCKETS):
+        if seconds <= le: h["buckets"][i] += 1
+    h["sum"] += seconds
+    h["count"] += 1
+
+def record_job(job, options):
+    global _bytes_total
+    fmt = options.get('metrics_format')
+    phases = snapshot(job)
+    with _lock:
+        _jobs_total[job['state']] = _jobs_total.get(job['state'], 0) + 1
+        _bytes_total += job.get('bytes', 0)
+        for phase, seconds in phases.items(): _observe(phase, seconds)
+        try:
+            if fmt == "prometheus": _write_prometheus(options.get('metrics_file') or METRICS_PROM_FILE)
+            elif fmt == "jsonl": _append_jsonl(options.get('metrics_file') or METRICS_JSONL_FILE, job, options, phases)
+        except OSError as e:
+            logging.error(f"Metrics Export Error: {e}")
+
+def _append_jsonl(path, job, options, phases):
+    line = {"ts": round(time.time(), 3), "url": job['url'], "state": job['state'], "engine": options.get('engine', "subprocess"),
+            "bytes": job.get('bytes', 0), "phases": phases}
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(line) + "\n")
+
+def render_prometheus():
+    out = ["# HELP ytmini_jobs_total Finished download jobs by final state.", "# TYPE ytmini_jobs_total counter"]
+    out += [f'ytmini_jobs_total{{state="{s}"}} {n}' for s, n in sorted(_jobs_total.items())]
+    out += ["# HELP ytmini_downloaded_bytes_total Bytes of finished files.", "# TYPE ytmini_downloaded_bytes_total counter",
+            f"ytmini_downloaded_bytes_total {_bytes_total}"]
+    out += ["# HELP ytmini_phase_seconds Time jobs spent in each phase.", "# TYPE ytmini_phase_seconds histogram"]
+    for phase in PHASES:
+        h = _histograms.get(phase)
+        if not h: continue
+        for le, n in zip(BUCKETS, h["buckets"]):
+            out.append(f'ytmini_phase_seconds_bucket{{phase="{phase}",le="{le}"}} {n}')
+        out.append(f'ytmini_phase_seconds_bucket{{phase="{phase}",le="+Inf"}} {h["count"]}')
+        out.append(f'ytmini_phase_seconds_sum{{phase="{phase}"}} {h["sum"]:.3f}')
+        out.append(f'ytmini_phase_seconds_count{{phase="{phase}"}} {h["count"]}')
+    return "\n".join(out) + "\n"
+
+def _write_prometheus(path):
+    # Write-then-rename so a scraper never reads a half-written file
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(render_prometheus())
+    os.replace(tmp, path)
@@ -0,0 +1,43 @@
+import sys
+import logging
+
+# --- NOTIFIERS ---
+# logic.py reports user-facing messages through the current notifier instead of
+# calling tkinter.messagebox, so it can run without a display. The GUI installs
+# TkNotifier at startup; everything else gets ConsoleNotifier.
+
+class Notifier(object):
+    # Log only; the others show the message on top of logging it
+    def info(self, title, msg): logging.info(f"{title}: {msg}")
+    def error(self, title, msg): logging.error(f"{title}: {msg}")
+
+class ConsoleNotifier(Notifier):
+    def info(self, title, msg):
+        super().info(title, msg)
+        print(f"[{title}] {msg}", file=sys.stderr)
+
+    def error(self, title, msg):
+        super().error(title, msg)
+        print(f"[{title}] ERROR: {msg}", file=sys.stderr)
+
+class TkNotifier(Notifier):
+    def __init__(self):
+        from tkinter import messagebox
+        self.messagebox = messagebox
+
+    def info(self, title, msg):
+        super().info(title, msg)
+        self.messagebox.showinfo(title, msg)
+
+    def error(self, title, msg):
+        super().error(title, msg)
+        self.messagebox.showerror(title, msg)
+
+_current = ConsoleNotifier()
+
+def set_notifier(notifier):
+    global _current
+    _current = notifier
+
+def info(title, msg): _current.info(title, msg)
+def error(title, msg): _current.error(title, msg)
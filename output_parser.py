@@ -0,0 +1,88 @@
+import json
+import re
+
+# --- YT-DLP OUTPUT PARSER ---
+# yt-dlp is asked to print one JSON object per progress update (PROGRESS_TEMPLATE,
+# with --newline), so every line can be classified by its prefix alone.
+# Events are plain dicts with a "type" key:
+#   progress: downloaded_bytes, total_bytes, speed, eta, fragment_index, fragment_count, percent
+#   data:     path, title, duration, size, url, video_id, extractor (one per finished file)
+#   start:    url                                (batch mode job marker)
+#   phase:    phase                              (metrics.PHASES; from PHASE_PRINTS)
+#   log:      line                               (everything else)
+
+PROGRESS_PREFIX = "PROG::"
+PROGRESS_TEMPLATE = PROGRESS_PREFIX + "%(progress.{status,downloaded_bytes,total_bytes,total_bytes_estimate,speed,eta,fragment_index,fragment_count})j"
+
+# Fallback for yt-dlp builds that ignore --progress-template
+_LEGACY_PERCENT = re.compile(r"\[download\]\s+(\d+\.?\d*)%")
+
+# Phase boundaries that stay visible under --print's implied --quiet. "post_process"
+# prints run before that stage's postprocessors (merge, audio extraction).
+PHASE_PRINTS = ["--print", "before_dl:PHASE::download", "--print", "post_process:PHASE::postprocess"]
+
+def progress_args():
+    # --print implies --quiet, which would hide progress without --progress
+    return ["--progress", "--newline", "--progress-template", f"download:{PROGRESS_TEMPLATE}"]
+
+def make_progress_event(d):
+    total = d.get('total_bytes') or d.get('total_bytes_estimate')
+    done = d.get('downloaded_bytes') or 0
+    return {
+        "type": "progress",
+        "downloaded_bytes": done,
+        "total_bytes": total,
+        "speed": d.get('speed'),
+        "eta": d.get('eta'),
+        "fragment_index": d.get('fragment_index'),
+        "fragment_count": d.get('fragment_count'),
+        "percent": (done * 100.0 / total) if total else None,
+    }
+
+def parse_line(line):
+    line = line.strip()
+    if line.startswith(PROGRESS_PREFIX):
+        try:
+            return make_progress_event(json.loads(line[len(PROGRESS_PREFIX):]))
+        except (ValueError, AttributeError):
+            return {"type": "log", "line": line}
+
+    if line.startswith("DATA::"):
+        # "DATA::path::title::duration::size[::original_url::id::extractor_key]"
+        parts = line.split("::")
+        if len(parts) >= 5:
+            return {
+                "type": "data",
+                "path": parts[1].strip(),
+                "title": parts[2].strip(),
+                "duration": parts[3].strip(),
+                "size": parts[4].strip(),
+                "url": parts[5].strip() if len(parts) >= 6 else "",
+                "video_id": parts[6].strip() if len(parts) >= 7 else "",
+                "extractor": parts[7].strip() if len(parts) >= 8 else "",
+            }
+
+    if line.startswith("PHASE::"):
+        return {"type": "phase", "phase": line[len("PHASE::"):].strip()}
+
+    if line.startswith("START::"):
+        return {"type": "start", "url": line[len("START::"):].strip()}
+
+    if line.startswith("[download]"):
+        match = _LEGACY_PERCENT.match(line)
+        if match:
+            return {"type": "progress", "downloaded_bytes": None, "total_bytes": None, "speed": None,
+                    "eta": None, "fragment_index": None, "fragment_count": None, "percent": float(match.group(1))}
+
+    return {"type": "log", "line": line}
+
+def iter_events(stream):
+    """Yields events from a text stream until EOF.
+
+    Iterating the pipe blocks in the OS until a full line arrives, so an idle or
+    merging download costs no CPU. Stray carriage-return updates are split apart.
+    """
+    for raw in stream:
+        for line in raw.split("\r"):
+            if line.strip():
+                yield parse_line(line)
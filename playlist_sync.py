@@ -0,0 +1,193 @@
+import re
+import time
+import logging
+import subprocess
+import api_engine
+import archive
+import process_tree
+import store
+
+# --- PLAYLIST SYNC ---
+# "--yes-playlist" makes yt-dlp enumerate and check every entry on every run. In
+# sync mode the playlist is listed lazily ("--flat-playlist --lazy-playlist") and
+# each new entry is handed to the scheduler as soon as it is listed. The listing
+# stops after sync_stop_after (10) consecutive entries a previous sync finished
+# (channels list newest first). Playlists that grow at the end are caught by a
+# second listing that starts at the index watermark of the last sync. Once a
+# playlist is known to grow at the head, that listing only runs when the head had
+# nothing new or the end was last checked more than TAIL_RECHECK ago.
+# Only completed syncs move the boundary: after an interrupted run, the next one
+# rescans the same range (finished entries are then skipped via the archive).
+
+SYNC_SCHEMA = """
+CREATE TABLE IF NOT EXISTS playlist_sync (
+    playlist   TEXT PRIMARY KEY,
+    title      TEXT,
+    watermark  INTEGER NOT NULL DEFAULT 0,
+    direction  TEXT,
+    tail_checked_at REAL,
+    synced_at  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS playlist_entries (
+    playlist  TEXT NOT NULL,
+    video_id  TEXT NOT NULL,
+    position  INTEGER,
+    synced_at REAL NOT NULL,
+    PRIMARY KEY (playlist, video_id)
+);
+"""
+
+TAIL_OVERLAP = 5 # entries before the watermark the tail listing re-reads (removed entries shift indices)
+TAIL_RECHECK = 7 * 24 * 3600 # seconds between tail listings of a playlist that grows at the head
+ENTRY_PRINT = "ENTRY::%(playlist_index)s::%(id)s::%(ie_key)s::%(url)s::%(playlist_title)s"
+
+def _conn():
+    store.ensure_schema("playlist_sync", SYNC_SCHEMA)
+    return store.get_connection()
+
+def load_state(playlist):
+    state = {"title": None, "watermark": 0, "direction": None, "tail_checked_at": None, "known": set()}
+    try:
+        conn = _conn()
+        row = conn.execute("SELECT title, watermark, direction, tail_checked_at FROM playlist_sync WHERE playlist = ?",
+                           (playlist,)).fetchone()
+        if row: state.update(title=row['title'], watermark=row['watermark'], direction=row['direction'],
+                             tail_checked_at=row['tail_checked_at'])
+        state["known"] = {r['video_id'] for r in conn.execute(
+            "SELECT video_id FROM playlist_entries WHERE playlist = ?", (playlist,))}
+    except Exception as e:
+        logging.error(f"Sync State Load Error: {e}")
+    return state
+
+def save_state(playlist, title, watermark, direction, tail_checked_at, entries):
+    """entries: [(video_id, position)] finished in this sync."""
+    now = time.time()
+    try:
+        conn = _conn()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO playlist_sync (playlist, title, watermark, direction, tail_checked_at, synced_at) "
+                         "VALUES (?, ?, ?, ?, ?, ?)", (playlist, title, watermark, direction, tail_checked_at, now))
+            conn.executemany("INSERT OR REPLACE INTO playlist_entries (playlist, video_id, position, synced_at) VALUES (?, ?, ?, ?)",
+                             [(playlist, video_id, position, now) for video_id, position in entries])
+    except Exception as e:
+        logging.error(f"Sync State Save Error: {e}")
+
+def _parse_entry(line):
+    if not line.startswith("ENTRY::"): return None
+    parts = line.rstrip("\n").split("::", 5)
+    if len(parts) < 6 or parts[2] in ("", "NA"): return None
+    index = int(parts[1]) if parts[1].isdigit() else 0
+    return {"index": index, "id": parts[2], "extractor": parts[3] if parts[3] != "NA" else None,
+            "url": parts[4], "playlist_title": parts[5] if parts[5] != "NA" else None}
+
+def _list_subprocess(playlist, options, start):
+    command = [options['yt_path'], "--flat-playlist", "--lazy-playlist", "--no-warnings",
+               "--print", ENTRY_PRINT, "-I", f"{start}:", playlist]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                               encoding='utf-8', errors='ignore', **process_tree.popen_kwargs())
+    try:
+        for line in process.stdout:
+            entry = _parse_entry(line)
+            if entry: yield entry
+        process.wait()
+        if process.returncode != 0: logging.warning(f"Playlist listing ended with code {process.returncode}: {playlist}")
+    finally:
+        # Early stop: the rest of the playlist is never fetched
+        process_tree.terminate_tree(process)
+        process.stdout.close()
+        process.wait()
+
+def list_entries(playlist, options, start=1):
+    """Yields the playlist's entries from index start on, as the extractor pages through them."""
+    if options.get('engine') == "api" and api_engine.is_available():
+        for entry in api_engine.iter_playlist(playlist, start):
+            yield {"index": entry.get('playlist_index') or 0, "id": entry.get('id'), "extractor": entry.get('ie_key'),
+                   "url": entry.get('url'), "playlist_title": entry.get('playlist_title')}
+    else:
+        yield from _list_subprocess(playlist, options, start)
+
+def entry_template(title, index):
+    # Same layout as the "--yes-playlist" template, with the playlist fields filled in
+    folder = re.sub(r'[<>:"/\\|?*]', "_", title or "Playlist").strip() or "Playlist"
+    return f"{folder.replace('%', '%%')}/{index:02d} - %(title)s.%(ext)s"
+
+class PlaylistSync(object):
+    """One playlist's sync run: lists the new entries and records the finished ones."""
+
+    def __init__(self, playlist, options):
+        self.playlist = playlist
+        self.options = options
+        self.stop_after = max(1, int(options.get('sync_stop_after') or 10))
+        self.state = load_state(playlist)
+        self.title = self.state["title"]
+        self.watermark = self.state["watermark"]
+        self.positions = {} # video_id -> playlist index, for every entry listed
+        self.archived = set() # listed, new to the sync state, but already downloaded
+        self.found = {"head": 0, "tail": 0}
+        self.tail_checked_at = self.state["tail_checked_at"]
+
+    def _scan(self, start, early_stop, where):
+        # True when the listing was stopped at the last sync's entries
+        listing = list_entries(self.playlist, self.options, start)
+        try:
+            yield from self._filter(listing, early_stop, where)
+        finally:
+            listing.close()
+        return self.stopped
+
+    def _filter(self, listing, early_stop, where):
+        known_run = 0
+        self.stopped = False
+        for entry in listing:
+            if not entry['id'] or not entry['url']: continue
+            self.title = entry['playlist_title'] or self.title
+            self.watermark = max(self.watermark, entry['index'])
+            if entry['id'] in self.positions: continue
+            self.positions[entry['id']] = entry['index']
+            if entry['id'] in self.state["known"]:
+                known_run += 1
+                if early_stop and known_run >= self.stop_after:
+                    logging.info(f"Sync {self.playlist}: reached the last sync at index {entry['index']}")
+                    self.stopped = True
+                    return
+                continue
+            known_run = 0
+            entry['url'] = archive.canonicalize_url(entry['url'])['url']
+            if archive.is_archived(entry['extractor'], entry['id'], archive.output_variant(self.options)):
+                self.archived.add(entry['id'])
+                continue
+            self.found[where] += 1
+            yield entry
+
+    def entries(self):
+        """Yields each new entry as soon as it is listed."""
+        first_sync = not self.state["known"]
+        stopped = yield from self._scan(1, not first_sync, "head")
+        # Playlists that append at the end: list from the old watermark on as well
+        if stopped and self.state["watermark"] and self._check_tail():
+            start = max(1, self.state["watermark"] + 1 - TAIL_OVERLAP)
+            yield from self._scan(start, False, "tail")
+            self.tail_checked_at = time.time()
+
+    def _check_tail(self):
+        if self.state["direction"] != "head": return True
+        # Growing at the head so far; the end may still get entries appended
+        return not self.found["head"] or time.time() - (self.state["tail_checked_at"] or 0) > TAIL_RECHECK
+
+    def job_options(self, entry):
+        # Each entry is downloaded as a single video into the playlist's folder
+        return dict(self.options, is_playlist=False, custom_tmpl=entry_template(self.title, entry['index']))
+
+    def finish(self, done_ids, completed):
+        """Records the entries finished in this run; only a completed sync moves the boundary."""
+        if not completed:
+            logging.info(f"Sync {self.playlist} interrupted; state left unchanged")
+            return
+        direction = self.state["direction"]
+        if self.found["tail"]: direction = "tail"
+        elif self.found["head"] and self.state["known"]: direction = "head"
+        finished = (set(done_ids) | self.archived | (self.state["known"] & set(self.positions)))
+        save_state(self.playlist, self.title, self.watermark, direction, self.tail_checked_at,
+                   [(video_id, self.positions.get(video_id)) for video_id in finished])
+        logging.info(f"Sync {self.playlist}: {self.found['head'] + self.found['tail']} new, "
+                     f"{len(self.archived)} already downloaded, watermark {self.watermark}")
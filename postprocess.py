@@ -0,0 +1,131 @@
+import os
+import time
+import logging
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import process_tree
+
+# --- POST-PROCESSING PIPELINE ---
+# Planned jobs (format_planner) are split in two stages. The download worker runs
+# yt-dlp with "-f VIDEO,AUDIO" (separate files, no merge) and hands the parts to
+# this pool, then moves straight on to the next URL. Here ffmpeg merges the parts
+# or extracts/transcodes the audio and writes the metadata tags. The pool is
+# sized to the CPU count, so the network and the CPU are busy at the same time.
+
+AUDIO_EXT = {"mp3": "mp3", "aac": "m4a", "m4a": "m4a", "opus": "opus", "vorbis": "ogg", "wav": "wav"}
+PASSTHROUGH_EXT = {"opus": "opus", "aac": "m4a", "vorbis": "ogg", "mp3": "mp3"}
+
+# --audio-quality tier ("0" high, "5" medium, "10" low) -> ffmpeg encoder args
+_ENCODERS = {
+    "mp3": lambda q: ["-c:a", "libmp3lame", "-q:a", {"0": "0", "5": "5"}.get(q, "9")],
+    "aac": lambda q: ["-c:a", "aac", "-b:a", {"0": "192k", "5": "128k"}.get(q, "96k")],
+    "m4a": lambda q: ["-c:a", "aac", "-b:a", {"0": "192k", "5": "128k"}.get(q, "96k")],
+    "opus": lambda q: ["-c:a", "libopus", "-b:a", {"0": "160k", "5": "96k"}.get(q, "64k")],
+    "vorbis": lambda q: ["-c:a", "libvorbis", "-q:a", {"0": "8", "5": "5"}.get(q, "2")],
+    "wav": lambda q: ["-c:a", "pcm_s16le"],
+}
+
+def ffmpeg_exe(ff_path):
+    # ffmpeg_path may point at the binary or at its folder (both work for --ffmpeg-location)
+    if ff_path and os.path.isdir(ff_path):
+        return os.path.join(ff_path, "ffmpeg.exe" if os.name == 'nt' else "ffmpeg")
+    return ff_path
+
+def is_available(options):
+    return bool(options.get('ff_path')) and os.path.exists(ffmpeg_exe(options['ff_path']))
+
+def part_template(template):
+    # Both parts of a "-f v,a" download need distinct names (VP9 and Opus are both .webm)
+    return template[:-len(".%(ext)s")] + ".f%(format_id)s.%(ext)s"
+
+def final_path(part_path, format_id, ext):
+    base = os.path.splitext(part_path)[0]
+    suffix = f".f{format_id}"
+    if base.endswith(suffix): base = base[:-len(suffix)]
+    return f"{base}.{ext}"
+
+def metadata_args(options):
+    args = []
+    if options.get('meta_artist'): args.extend(["-metadata", f"artist={options['meta_artist']}"])
+    if options.get('meta_album'): args.extend(["-metadata", f"album={options['meta_album']}"])
+    return args
+
+def merge_command(ff, video_path, audio_path, out_path, audio_encoder=None, subtitles=None, subtitle_codec=None):
+    # subtitles: [(path, lang)] embedded in the same pass, so the merged file is written once
+    subtitles = subtitles or []
+    command = [ff, "-y", "-loglevel", "error", "-i", video_path, "-i", audio_path]
+    for path, _ in subtitles: command.extend(["-i", path])
+    command.extend(["-map", "0:v:0", "-map", "1:a:0"])
+    for i, (_, lang) in enumerate(subtitles):
+        command.extend(["-map", f"{i + 2}:s:0", f"-metadata:s:s:{i}", f"language={lang}"])
+    command.extend(["-c", "copy"])
+    if audio_encoder: command.extend(["-c:a", audio_encoder])
+    if subtitles: command.extend(["-c:s", subtitle_codec or "copy"])
+    return command + [out_path]
+
+def audio_command(ff, in_path, out_path, tgt, q, passthrough, meta):
+    command = [ff, "-y", "-loglevel", "error", "-i", in_path, "-vn"]
+    command.extend(["-c:a", "copy"] if passthrough else _ENCODERS[tgt](q))
+    return command + meta + [out_path]
+
+def run_ffmpeg(command, on_start=None):
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                               encoding='utf-8', errors='ignore', **process_tree.popen_kwargs())
+    if on_start: on_start(process)
+    output, _ = process.communicate()
+    if process.returncode != 0:
+        logging.error(f"ffmpeg failed ({process.returncode}): {output.strip()[-300:]}")
+    return process.returncode == 0
+
+class Pipeline(object):
+    """Post-processing pool plus the counters shown in the status line."""
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 2
+        self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="postprocess")
+        self.lock = threading.Lock()
+        self.futures = []
+        self.queued = 0
+        self.running = 0
+        self.stage_time = {"download": 0.0, "post": 0.0}
+        self.stage_count = {"download": 0, "post": 0}
+
+    def record(self, stage, seconds):
+        with self.lock:
+            self.stage_time[stage] += seconds
+            self.stage_count[stage] += 1
+
+    def submit(self, fn, *args):
+        def task():
+            with self.lock:
+                self.queued -= 1
+                self.running += 1
+            t0 = time.monotonic()
+            try:
+                return fn(*args)
+            finally:
+                self.record("post", time.monotonic() - t0)
+                with self.lock: self.running -= 1
+        with self.lock:
+            self.queued += 1
+            future = self.pool.submit(task)
+            self.futures.append(future)
+        return future
+
+    def status(self):
+        with self.lock:
+            avg = {s: self.stage_time[s] / self.stage_count[s] for s in self.stage_time if self.stage_count[s]}
+            parts = [f"post-processing: {self.queued} queued, {self.running} running"]
+            if avg:
+                parts.append(", ".join(f"avg {s} {t:.1f}s" for s, t in avg.items()))
+            return " | ".join(parts)
+
+    def drain(self):
+        """Waits for every submitted task; returns the sum of their results."""
+        total = 0
+        for future in list(self.futures):
+            try: total += future.result() or 0
+            except Exception as e: logging.critical(f"Critical System Error: {e}")
+        self.pool.shutdown(wait=True)
+        return total
@@ -0,0 +1,32 @@
+import os
+import signal
+import logging
+import subprocess
+from config import CREATE_NO_WINDOW
+
+# --- PROCESS GROUPS ---
+# yt-dlp starts ffmpeg (merging, HLS, audio extraction) as a child process.
+# terminate() on yt-dlp alone leaves that child running and holding the files,
+# so every download is started as the leader of its own process group and is
+# stopped as a whole tree.
+
+CREATE_NEW_PROCESS_GROUP = 0x00000200
+
+def popen_kwargs():
+    """Extra Popen arguments that make the child a process group leader."""
+    if os.name == 'nt':
+        return {"creationflags": CREATE_NO_WINDOW | CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+def terminate_tree(process):
+    if process is None or process.poll() is not None: return
+    try:
+        if os.name == 'nt':
+            # /T takes the whole tree, /F because console-less children ignore a polite close
+            subprocess.run(["taskkill", "/T", "/F", "/PID", str(process.pid)],
+                           capture_output=True, creationflags=CREATE_NO_WINDOW)
+        else:
+            os.killpg(process.pid, signal.SIGTERM)
+    except (OSError, subprocess.SubprocessError) as e:
+        logging.warning(f"Process tree kill failed ({process.pid}): {e}")
+        process.terminate()
@@ -0,0 +1,134 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from config import HISTORY_DB, HISTORY_FILE
+
+# --- SQLITE STORE ---
+# One WAL-mode database shared by the UI thread and all download workers.
+# Each thread gets its own connection; WAL lets readers run while a worker writes.
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schemas_ready = set()
+
+HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    path     TEXT PRIMARY KEY,
+    video_id TEXT,
+    title    TEXT,
+    duration TEXT,
+    size     TEXT,
+    added_at REAL NOT NULL,
+    extra    TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_history_video_id ON history(video_id);
+CREATE INDEX IF NOT EXISTS idx_history_added_at ON history(added_at);
+"""
+
+_BASE_KEYS = ("path", "video_id", "title", "duration", "size", "added_at")
+
+def get_connection():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(HISTORY_DB, timeout=10)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _local.conn = conn
+    return conn
+
+def close_connection():
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+def ensure_schema(name, ddl):
+    # Modules register their own tables; each script runs once per process
+    if name in _schemas_ready: return
+    with _schema_lock:
+        if name in _schemas_ready: return
+        conn = get_connection()
+        conn.executescript(ddl)
+        if name == "history": _migrate_json_history(conn)
+        _schemas_ready.add(name)
+
+# --- HISTORY ---
+def _migrate_json_history(conn):
+    # One-time import of the old history.json (newest entry first)
+    if not os.path.exists(HISTORY_FILE): return
+    try:
+        with open(HISTORY_FILE, "r") as f:
+            old = json.load(f)
+        now = time.time()
+        with conn:
+            for i, item in enumerate(old):
+                # Preserve the original order: later list items get older timestamps
+                _insert_entry(conn, item, now - i, replace=False)
+        os.replace(HISTORY_FILE, HISTORY_FILE + ".migrated")
+        logging.info(f"Migrated {len(old)} history entries from {HISTORY_FILE}")
+    except Exception as e:
+        logging.error(f"History Migration Error: {e}")
+
+def _insert_entry(conn, entry, added_at, replace=True):
+    extra = {k: v for k, v in entry.items() if k not in _BASE_KEYS}
+    verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+    conn.execute(
+        f"{verb} INTO history (path, video_id, title, duration, size, added_at, extra) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (entry['path'], entry.get('video_id'), entry.get('title', ""), entry.get('duration', ""),
+         entry.get('size', ""), added_at, json.dumps(extra) if extra else None))
+
+def _row_to_entry(row):
+    entry = {k: row[k] for k in _BASE_KEYS}
+    if row['extra']:
+        entry.update(json.loads(row['extra']))
+    return entry
+
+def _history_conn():
+    ensure_schema("history", HISTORY_SCHEMA)
+    return get_connection()
+
+def add_to_history(entry):
+    try:
+        conn = _history_conn()
+        with conn:
+            _insert_entry(conn, entry, time.time())
+    except Exception as e:
+        logging.error(f"History Save Error: {e}")
+
+def load_history(limit=None, offset=0):
+    # Newest first; limit=None returns everything
+    try:
+        rows = _history_conn().execute(
+            "SELECT * FROM history ORDER BY added_at DESC LIMIT ? OFFSET ?",
+            (-1 if limit is None else limit, offset)).fetchall()
+        return [_row_to_entry(r) for r in rows]
+    except Exception as e:
+        logging.error(f"History Load Error: {e}")
+        return []
+
+def count_history():
+    try:
+        return _history_conn().execute("SELECT COUNT(*) FROM history").fetchone()[0]
+    except Exception as e:
+        logging.error(f"History Load Error: {e}")
+        return 0
+
+def delete_from_history(path):
+    try:
+        conn = _history_conn()
+        with conn:
+            conn.execute("DELETE FROM history WHERE path = ?", (path,))
+    except Exception as e:
+        logging.error(f"History Save Error: {e}")
+
+def clear_history():
+    try:
+        conn = _history_conn()
+        with conn:
+            conn.execute("DELETE FROM history")
+    except Exception as e:
+        logging.error(f"History Save Error: {e}")
@@ -0,0 +1,66 @@
+import re
+import logging
+
+# --- SUBTITLE SELECTION ---
+# "--sub-langs en,.*" made yt-dlp fetch every track a video has (dozens on popular
+# videos, one request and one file each). Instead the wanted languages come from
+# the subtitle_langs preference list ("en,orig,de"), matched against the tracks the
+# (cached) info dict lists, and only those are requested. "orig" stands for the
+# video's original language. Without info (playlists, batch mode) the preference
+# list is passed to yt-dlp as exact patterns.
+
+ORIGINAL = "orig"
+SUB_FORMAT = "vtt/srt/best"
+# ffmpeg subtitle codec per container when the tracks are embedded
+EMBED_CODEC = {"mp4": "mov_text", "webm": "webvtt", "mkv": "srt"}
+
+def parse_langs(text):
+    langs = [l.strip() for l in (text or "").split(",") if l.strip()]
+    return langs or ["en", ORIGINAL]
+
+def original_language(info):
+    if info.get('language'): return info['language']
+    # YouTube marks the original audio track with a positive language_preference
+    tracks = [f for f in info.get('formats') or [] if f.get('language') and (f.get('language_preference') or 0) > 0]
+    if tracks: return max(tracks, key=lambda f: f['language_preference'])['language']
+    # The "xx-orig" auto caption is speech recognition in the spoken language
+    for code in info.get('automatic_captions') or {}:
+        if code.endswith("-orig"): return code[:-len("-orig")]
+    return None
+
+def _match(lang, available):
+    if lang in available: return lang
+    # "en" also takes "en-US" / "en-GB" (first listed), "pt-BR" also takes "pt"
+    base = lang.split("-")[0].lower()
+    for code in available:
+        if code.split("-")[0].lower() == base: return code
+    return None
+
+def select(info, options):
+    """Track codes to download, in preference order ([] = none of them exists)."""
+    available = [code for code in info.get('subtitles') or {} if code != "live_chat"]
+    chosen = []
+    for lang in parse_langs(options.get('sub_langs')):
+        if lang == ORIGINAL:
+            lang = original_language(info)
+            if not lang: continue
+        code = _match(lang, available)
+        if code and code not in chosen: chosen.append(code)
+    if not chosen:
+        logging.info(f"No subtitles in {options.get('sub_langs') or 'en,orig'} (available: {', '.join(available) or 'none'})")
+    return chosen
+
+def command_args(langs, options, embed_inline=True):
+    """yt-dlp arguments for the chosen tracks; langs=None means no info was available."""
+    if langs is None:
+        # Exact codes only; "orig" cannot be resolved without the info dict
+        langs = [re.escape(l) for l in parse_langs(options.get('sub_langs')) if l != ORIGINAL] or ["en"]
+    elif not langs:
+        return []
+    else:
+        langs = [re.escape(l) for l in langs]
+    args = ["--write-subs", "--sub-langs", ",".join(langs), "--sub-format", SUB_FORMAT]
+    # The pipeline embeds them in its own merge pass instead (postprocess.merge_command)
+    if options.get('embed_subs') and options['mode'] == "video" and embed_inline:
+        args.append("--embed-subs")
+    return args
@@ -0,0 +1,153 @@
+import os
+import json
+import shutil
+import logging
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from config import TOOLS_CACHE_FILE, CREATE_NO_WINDOW
+
+# --- TOOL DISCOVERY ---
+# Finds yt-dlp and ffmpeg on PATH and in known install roots, probes their
+# versions in parallel and caches everything in TOOLS_CACHE_FILE. Later runs
+# only stat() the cached roots and binaries; a tree is walked again when its
+# directory mtime changed (e.g. a new WinGet package was installed) or a cached
+# binary is gone (an upgrade replaces the nested versioned folder only).
+# Never call discover() on the Tk thread; use discover_async().
+
+IS_WINDOWS = os.name == 'nt'
+EXE = ".exe" if IS_WINDOWS else ""
+
+# Trees that need a recursive walk (slow), per platform
+def _walk_roots():
+    if IS_WINDOWS:
+        return [os.path.expanduser(r"~\AppData\Local\Microsoft\WinGet\Packages")]
+    return []
+
+# Flat directories checked directly, in addition to PATH
+def _known_dirs():
+    if IS_WINDOWS:
+        return [r"C:\ffmpeg\bin", r"C:\Program Files\ffmpeg\bin", os.path.expanduser(r"~\AppData\Local\Microsoft\WinGet\Links")]
+    return ["/usr/local/bin", "/usr/bin", "/snap/bin", "/opt/homebrew/bin",
+            os.path.expanduser("~/.local/bin"), os.path.expanduser("~/bin")]
+
+VERSION_ARGS = {"yt-dlp": ["--version"], "ffmpeg": ["-version"]}
+
+def _load_cache():
+    try:
+        with open(TOOLS_CACHE_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"roots": {}, "tools": {}}
+
+def _save_cache(cache):
+    try:
+        tmp = TOOLS_CACHE_FILE + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(cache, f, indent=2)
+        os.replace(tmp, TOOLS_CACHE_FILE)
+    except OSError as e:
+        logging.error(f"Tools cache save failed: {e}")
+
+def _mtime(path):
+    try: return os.stat(path).st_mtime
+    except OSError: return None
+
+def _walk_for(root, names):
+    found = {n: [] for n in names}
+    files_wanted = {n + EXE: n for n in names}
+    for dirpath, dirs, files in os.walk(root):
+        for f in files:
+            name = files_wanted.get(f.lower() if IS_WINDOWS else f)
+            if name: found[name].append(os.path.join(dirpath, f))
+    return found
+
+def _flat_candidates(name):
+    dirs = os.environ.get("PATH", "").split(os.pathsep) + _known_dirs()
+    found = []
+    for d in dirs:
+        p = os.path.join(d, name + EXE)
+        if d and os.path.isfile(p) and os.access(p, os.X_OK):
+            found.append(os.path.normpath(p))
+    which = shutil.which(name)
+    if which: found.insert(0, os.path.normpath(which))
+    return found
+
+def probe_version(name, path):
+    try:
+        result = subprocess.run([path] + VERSION_ARGS[name], capture_output=True, text=True,
+                                timeout=15, creationflags=CREATE_NO_WINDOW, encoding='utf-8', errors='ignore')
+        first = (result.stdout or result.stderr).strip().splitlines()
+        return first[0].strip() if first else ""
+    except Exception as e:
+        logging.warning(f"Version probe failed for {path}: {e}")
+        return None
+
+def discover(names=("yt-dlp", "ffmpeg"), force=False):
+    """Returns {name: [{"path", "version"}, ...]} for every tool found."""
+    cache = {"roots": {}, "tools": {}} if force else _load_cache()
+    found = {n: [] for n in names}
+
+    # 1. Recursive roots: reuse the cached file list unless the root changed
+    for root in _walk_roots():
+        mtime = _mtime(root)
+        if mtime is None: continue
+        cached = cache["roots"].get(root)
+        if cached and cached.get("mtime") == mtime and all(n in cached["found"] for n in names) \
+                and all(os.path.isfile(p) for n in names for p in cached["found"][n]):
+            paths = cached["found"]
+        else:
+            logging.info(f"Scanning {root} for tools")
+            paths = _walk_for(root, names)
+            cache["roots"][root] = {"mtime": mtime, "found": paths}
+        for n in names: found[n].extend(paths.get(n, []))
+
+    # 2. PATH and known flat dirs: a handful of stat() calls
+    for n in names:
+        found[n] = list(dict.fromkeys(_flat_candidates(n) + found[n]))
+
+    # 3. Versions: reuse while the binary is unchanged, probe the rest in parallel
+    to_probe = []
+    for n in names:
+        for p in found[n]:
+            entry = cache["tools"].get(p)
+            if not entry or entry.get("mtime") != _mtime(p) or entry.get("version") is None:
+                to_probe.append((n, p))
+    if to_probe:
+        with ThreadPoolExecutor(max_workers=min(8, len(to_probe))) as pool:
+            versions = list(pool.map(lambda np: probe_version(*np), to_probe))
+        for (n, p), v in zip(to_probe, versions):
+            cache["tools"][p] = {"mtime": _mtime(p), "version": v}
+
+    _save_cache(cache)
+    return {n: [{"path": p, "version": cache["tools"].get(p, {}).get("version")} for p in found[n]] for n in names}
+
+def discover_async(callback, names=("yt-dlp", "ffmpeg"), force=False):
+    """Runs discover() on a worker thread and passes the result to callback there."""
+    import threading
+    def run():
+        try: result = discover(names, force)
+        except Exception as e:
+            logging.error(f"Tool discovery failed: {e}")
+            result = {n: [] for n in names}
+        callback(result)
+    threading.Thread(target=run, daemon=True).start()
+
+# --- SCORED SELECTION ---
+def score_ffmpeg(tool):
+    p = tool["path"].lower()
+    if "solidworks" in p: return -100 # bundled build that lacks codecs
+    score = 0
+    if "gyan" in p and "shared" in p: score += 30 # full shared build
+    elif "gyan" in p or "full" in p: score += 20
+    else: score += 10
+    return score
+
+def score_ytdlp(tool):
+    return 10
+
+def select_best(tools, scorer):
+    # Only binaries that answered the version probe qualify; highest score wins,
+    # ties keep discovery order (PATH first)
+    runnable = [t for t in tools if t.get("version") is not None]
+    if not runnable: return None
+    return max(enumerate(runnable), key=lambda it: (scorer(it[1]), -it[0]))[1]
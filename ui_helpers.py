@@ -57,6 +57,17 @@ def apply_theme(root, current_theme_name):
     return colors
 
 # --- HISTORY CARD CREATOR ---
+def history_details(item):
+    # Second line of a history card; optional fields only appear when recorded
+    parts = [item['duration'], item['size']]
+    if item.get('audio_path'):
+        parts.append(f"{item['format_id']} ({item['audio_path']})")
+    elif item.get('format_id'):
+        parts.append(f"{item['format_id']} ({'audio re-encoded' if item.get('reencode') else 'remux'})")
+    if item.get('reclaimed'):
+        parts.append(f"{item['reclaimed']} reclaimed ({item['dedupe']})")
+    return "  |  ".join(parts)
+
 def create_history_card(parent_frame, item, colors, open_file_cmd, open_folder_cmd, delete_cmd):
     card = tk.Frame(parent_frame, bg=colors["card_bg"], highlightbackground=colors["card_border"], highlightthickness=1)
     card.pack(fill="x", padx=10, pady=5, ipady=5)
@@ -70,7 +81,7 @@ def create_history_card(parent_frame, item, colors, open_file_cmd, open_folder_c
               command=lambda: open_file_cmd(item["path"])).pack(fill="x")
     
     # Details
-    tk.Label(info_frame, text=f"{item['duration']}  |  {item['size']}", anchor="w", font=("Arial", 8), 
+    tk.Label(info_frame, text=history_details(item), anchor="w", font=("Arial", 8), 
              bg=colors["card_bg"], fg=colors["status_fg"]).pack(fill="x")
 
     btn_frame = tk.Frame(card, bg=colors["card_bg"])
@@ -82,4 +93,166 @@ def create_history_card(parent_frame, item, colors, open_file_cmd, open_folder_c
     
     # Delete Button
     tk.Button(btn_frame, text="🗑️", width=3, bg="#ffdddd", fg="red",
-              command=lambda: delete_cmd(item)).pack(side="left", padx=2)
\ No newline at end of file
+              command=lambda: delete_cmd(item)).pack(side="left", padx=2)
+
+# --- VIRTUALIZED HISTORY LIST (CustomTkinter) ---
+# Only the rows that fit on screen exist as widgets. Scrolling re-binds the same
+# row cards to a different slice of the history store instead of creating or
+# destroying widgets, so 10,000 entries cost the same as 10.
+class VirtualHistoryList(object):
+    ROW_HEIGHT = 58
+
+    def __init__(self, parent, fetch, count, open_file_cmd, open_folder_cmd, delete_cmd):
+        import customtkinter as ctk
+        self.ctk = ctk
+        self.fetch = fetch # fetch(limit, offset) -> entries, newest first
+        self.count = count
+        self.open_file_cmd = open_file_cmd
+        self.open_folder_cmd = open_folder_cmd
+        self.delete_cmd = delete_cmd
+
+        self.top = 0 # index of the first visible entry
+        self.total = 0
+        self.window = [] # entries currently bound to rows
+        self.rows = []
+        self.visible_count = 1
+        self.loaded = False # nothing is fetched until the first reload()
+
+        self.frame = ctk.CTkFrame(parent)
+        self.scrollbar = ctk.CTkScrollbar(self.frame, command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        self.body = ctk.CTkFrame(self.frame, fg_color="transparent")
+        self.body.pack(side="left", fill="both", expand=True)
+        self.empty_label = ctk.CTkLabel(self.body, text="No recent downloads.", font=("Arial", 12, "italic"), text_color="gray")
+
+        self.body.bind("<Configure>", self._on_resize)
+        self._bind_wheel(self.body)
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    # --- Row pool ---
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self._on_wheel)
+        widget.bind("<Button-4>", lambda e: self.scroll_to(self.top - 1))
+        widget.bind("<Button-5>", lambda e: self.scroll_to(self.top + 1))
+
+    def _make_row(self):
+        ctk = self.ctk
+        row = {}
+        card = ctk.CTkFrame(self.body, height=self.ROW_HEIGHT - 6, fg_color=("gray90", "gray20"))
+        card.pack_propagate(False)
+        info_col = ctk.CTkFrame(card, fg_color="transparent")
+        info_col.pack(side="left", fill="both", expand=True, padx=10, pady=5)
+        row['title'] = ctk.CTkButton(info_col, text="", anchor="w", fg_color="transparent",
+                                     text_color=("black", "white"), hover=False, font=("Arial", 12, "bold"))
+        row['title'].pack(fill="x")
+        row['details'] = ctk.CTkLabel(info_col, text="", anchor="w", font=("Arial", 10), text_color="gray")
+        row['details'].pack(fill="x")
+
+        btn_col = ctk.CTkFrame(card, fg_color="transparent")
+        btn_col.pack(side="right", padx=10)
+        row['folder'] = ctk.CTkButton(btn_col, text="📂", width=40, height=30, fg_color="transparent", border_width=1, border_color="gray", text_color=("black", "white"))
+        row['folder'].pack(side="left", padx=2)
+        row['delete'] = ctk.CTkButton(btn_col, text="🗑️", width=40, height=30, fg_color="#ffdddd", hover_color="#ffcccc", text_color="red")
+        row['delete'].pack(side="left", padx=2)
+
+        for w in (card, info_col, row['details'], btn_col):
+            self._bind_wheel(w)
+        row['card'] = card
+        row['shown'] = False
+        return row
+
+    def _bind_row(self, row, item):
+        row['title'].configure(text=item["title"], command=lambda p=item["path"]: self.open_file_cmd(p))
+        row['details'].configure(text=history_details(item))
+        row['folder'].configure(command=lambda p=item["path"]: self.open_folder_cmd(p))
+        row['delete'].configure(command=lambda i=item: self.delete_cmd(i))
+        if not row['shown']:
+            row['card'].pack(fill="x", padx=5, pady=3)
+            row['shown'] = True
+
+    def _render(self):
+        # Re-bind the pooled rows to the current window; no widgets are created here
+        for i, row in enumerate(self.rows):
+            if i < len(self.window):
+                self._bind_row(row, self.window[i])
+            elif row['shown']:
+                row['card'].pack_forget()
+                row['shown'] = False
+
+        if self.total == 0: self.empty_label.pack(pady=20)
+        else: self.empty_label.pack_forget()
+
+        if self.total <= self.visible_count:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self.top / self.total, min(1.0, (self.top + self.visible_count) / self.total))
+
+    def _load_window(self):
+        self.window = self.fetch(self.visible_count, self.top)
+        self._render()
+
+    # --- Public API ---
+    def reload(self):
+        self.loaded = True
+        self.total = self.count()
+        self.top = max(0, min(self.top, self.total - self.visible_count))
+        self._load_window()
+
+    def scroll_to(self, index):
+        index = max(0, min(int(index), self.total - self.visible_count))
+        if index != self.top:
+            self.top = index
+            self._load_window()
+
+    def insert_top(self, entry):
+        # A new download is the newest entry; an upsert of an existing path moves it up.
+        # The store decides which: the path may already be there, outside the window
+        total = self.count()
+        grew = total > self.total
+        self.total = total
+        if self.top > 0:
+            if grew:
+                # Keep the rows the user is looking at in place
+                self.top += 1
+                self._render()
+            else:
+                self._load_window()
+            return
+        self.window = [entry] + [e for e in self.window if e['path'] != entry['path']]
+        self.window = self.window[:self.visible_count]
+        self._render()
+
+    def remove(self, path):
+        before = len(self.window)
+        self.window = [e for e in self.window if e['path'] != path]
+        if len(self.window) == before:
+            self.reload()
+            return
+        self.total -= 1
+        # Pull one row up from below the visible slice to fill the gap
+        self.window += self.fetch(1, self.top + len(self.window))
+        self._render()
+
+    # --- Events ---
+    def _on_resize(self, event):
+        visible = max(1, event.height // self.ROW_HEIGHT)
+        if visible == self.visible_count and self.rows: return
+        self.visible_count = visible
+        while len(self.rows) < visible:
+            self.rows.append(self._make_row())
+        if self.loaded: self.reload()
+
+    def _on_wheel(self, event):
+        step = -1 if event.delta > 0 else 1
+        if abs(event.delta) >= 120: step *= abs(event.delta) // 120
+        self.scroll_to(self.top + step)
+
+    def _on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            self.scroll_to(round(float(args[1]) * self.total))
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            if len(args) > 2 and args[2] == "pages": amount *= self.visible_count
+            self.scroll_to(self.top + amount)